@@ -0,0 +1,31 @@
+from django.db.models import prefetch_related_objects
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+
+class BulkCreateMixin:
+    """
+    Adds a ``bulk/`` route creating every object of a list in one request. The
+    list is validated and saved by the serializer's list class, which should
+    validate it with a few set-based queries and insert it with one
+    ``bulk_create``, such as ``bookings.serializers.BulkListSerializer``.
+
+    Either every object is created, or none is and the response lists the errors
+    of each item, ``{}`` for the valid ones.
+    """
+    bulk_max_items = 1000
+    # Looked up for the created objects at once, rather than by each one's serializer.
+    bulk_prefetch_related = []
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request, *args, **kwargs):
+        serializer = self.get_bulk_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        instances = serializer.save()
+        prefetch_related_objects(instances, *self.bulk_prefetch_related)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        kwargs.update(many=True, allow_empty=False, max_length=self.bulk_max_items)
+        return self.get_serializer(*args, **kwargs)
@@ -0,0 +1,179 @@
+import hashlib
+from datetime import datetime
+
+from django.db.models import DateTimeField, F
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from app.pagination import get_ordering_lookups
+from app.query_budget import record_queries
+
+CONDITIONAL_HEADERS = ("HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE", "HTTP_IF_MATCH", "HTTP_IF_UNMODIFIED_SINCE")
+
+
+def make_etag(request, *parts):
+    # The media type is part of the tag, JSON and the browsable API differ in body.
+    digest = hashlib.sha1(repr((request.accepted_media_type, parts)).encode())
+    return quote_etag(digest.hexdigest())
+
+
+def validator_headers(etag, last_modified=None):
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified.timestamp())
+    return headers
+
+
+def is_conditional(request):
+    return any(header in request.META for header in CONDITIONAL_HEADERS)
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Returns the 304 Not Modified (or 412 Precondition Failed) response the request's
+    conditional headers call for, or None when the full response should be sent.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        for header, value in validator_headers(etag, last_modified).items():
+            response[header] = value
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Sends an ETag with the list and retrieve responses, and answers requests whose
+    If-None-Match (or, on retrieve, If-Modified-Since) still matches with a 304,
+    without loading model instances or serializing anything.
+
+    The validators of a response are the primary keys of the rows it renders, the
+    requested page of a list, with their ``etag_fields`` and ``etag_aggregates``,
+    and the state of the pagination links, see ``get_pagination_state``.
+    These must change whenever the rendered data does: the rows' ``updated_at``,
+    the timestamps of the related rows shown, and columns such as counters moved by
+    ``QuerySet.update`` without touching ``updated_at``. Aggregates are evaluated
+    per row, prefer correlated subqueries to joins that would group the whole table.
+
+    The validators are annotated onto the queryset, so a full response reads them
+    from the rows it loads anyway. Only conditional requests run a query of their
+    own, a ``.values()`` query over the same page, before the response is built.
+    When that response is sent after all, the request's query budget is raised by
+    the queries the validators made.
+    Retrieve responses whose validators are all timestamps also get a Last-Modified,
+    the latest of them. The others do not, a counter moved by ``QuerySet.update``
+    or a related row deleted changes the response without moving any timestamp.
+    Neither do list responses, since removing a row from a page does the same.
+    """
+    etag_fields = ["updated_at"]
+    etag_aggregates = {}
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if is_conditional(request):
+            with record_queries() as recorder:
+                validators = self.get_validators()
+            if validators is not None:
+                response = not_modified(request, *validators)
+                if response is not None:
+                    return response
+            # The response is built on top of the validators' queries, which the
+            # view's query_budget does not count.
+            if getattr(request._request, "query_budget", None) is not None:
+                request._request.query_budget += recorder.count
+
+        self.etag_rows = None
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            validators = self.get_response_validators()
+            if validators is not None:
+                for header, value in validator_headers(*validators).items():
+                    response[header] = value
+        return response
+
+    def get_etag_fields(self):
+        return self.etag_fields
+
+    def get_etag_annotations(self):
+        annotations = {f"etag_{lookup.replace('__', '_')}": F(lookup) for lookup in self.get_etag_fields()}
+        annotations.update({f"etag_{name}": aggregate for name, aggregate in self.etag_aggregates.items()})
+        return annotations
+
+    def filter_queryset(self, queryset):
+        # Annotated last, the fields may refer to annotations added by get_queryset.
+        queryset = super().filter_queryset(queryset)
+        if self.request is not None and self.request.method == "GET":
+            annotations = self.get_etag_annotations()
+            queryset = queryset.annotate(**annotations)
+            # Decided from the columns, a count is NULL as often as a timestamp is.
+            self.etag_timestamps_only = all(
+                isinstance(queryset.query.annotations[name].output_field, DateTimeField) for name in annotations
+            )
+        return queryset
+
+    def get_extra_row_lookups(self):
+        # Read by app.fast_list along with the rendered fields.
+        return [*super().get_extra_row_lookups(), *self.get_etag_annotations()]
+
+    def paginate_queryset(self, queryset):
+        self.etag_rows = super().paginate_queryset(queryset)
+        return self.etag_rows
+
+    def get_object(self):
+        instance = super().get_object()
+        self.etag_rows = [instance]
+        return instance
+
+    def get_validators(self):
+        """
+        Returns the ETag and Last-Modified of the response to a conditional request,
+        from a ``.values()`` query, or None to build the response regardless.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        rows = queryset.values(*dict.fromkeys(get_ordering_lookups(self) + list(self.get_etag_annotations())))
+        if self.action == "retrieve":
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            rows = rows.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})[:1]
+            if not rows:
+                return None
+        else:
+            page = self.paginate_queryset(rows)
+            rows = rows if page is None else page
+        return self.validators_from_rows(list(rows))
+
+    def get_response_validators(self):
+        """Returns the ETag and Last-Modified of the response just built, from the rows it rendered."""
+        if self.etag_rows is None:
+            return None
+        return self.validators_from_rows(self.etag_rows)
+
+    def get_pagination_state(self):
+        """
+        What the page's links and totals depend on, besides its rows: whether there
+        is a next and a previous cursor page, or the count of page-number pages.
+        """
+        paginator = getattr(self.paginator, "paginator", self.paginator)
+        page = getattr(paginator, "page", None)
+        if page is None:
+            return None
+        if hasattr(page, "paginator"):
+            return page.paginator.count
+        return paginator.has_next, paginator.has_previous
+
+    def validators_from_rows(self, rows):
+        names = ["pk", *self.get_etag_annotations()]
+        values = [
+            tuple(row[name] if isinstance(row, dict) else getattr(row, name) for name in names)
+            for row in rows
+        ]
+        if self.action != "retrieve":
+            return make_etag(self.request, values, self.get_pagination_state()), None
+        if not getattr(self, "etag_timestamps_only", False):
+            return make_etag(self.request, values), None
+        timestamps = [value for value in values[0] if isinstance(value, datetime)]
+        return make_etag(self.request, values), max(timestamps, default=None)
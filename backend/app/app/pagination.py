@@ -0,0 +1,154 @@
+import json
+import operator
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination,
+    _reverse_ordering,
+)
+
+
+def get_ordering_lookups(view):
+    """
+    The columns a view's pagination reads its position from, for views paginating
+    ``.values()`` rows rather than model instances.
+    """
+    aliases = getattr(view, "ordering_aliases", {})
+    ordering_fields = getattr(view, "ordering_fields", None)
+    lookups = ["pk"]
+    lookups += [term.lstrip("-") for term in getattr(view, "ordering", None) or []]
+    if isinstance(ordering_fields, (list, tuple)):
+        lookups += [aliases.get(name, name) for name in ordering_fields]
+    return lookups
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination that positions the cursor on every column of the ordering,
+    with the primary key appended as a tie-breaker. Each page is then a single
+    indexed range query, without the COUNT(*) and growing OFFSET of page numbers,
+    and rows sharing a timestamp never need an offset to page past.
+
+    The ordering is read from the view's ``ordering`` attribute, or from its
+    ordering filter when it has one. Clients may ask for up to ``max_page_size``
+    rows per page with ``page_size``.
+    """
+    ordering = ("pk",)
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        self.ordering = getattr(view, "ordering", None) or self.ordering
+        ordering = super().get_ordering(request, queryset, view)
+        if not {"pk", "-pk", "id", "-id"} & set(ordering):
+            ordering += ("pk",)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        current_position = self.cursor.position if self.cursor is not None else None
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, current_position))
+
+        # Fetch one extra row to find out whether there is a following page.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            following_position = None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_keyset_filter(self, ordering, position):
+        """Matches the rows that come after ``position`` in ``ordering``."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        # (a, b) > (x, y) expands to: a > x OR (a = x AND b > y)
+        conditions = []
+        preceding_equal = Q()
+        for term, value in zip(ordering, values):
+            field = term.lstrip("-")
+            lookup = "lt" if term.startswith("-") else "gt"
+            conditions.append(preceding_equal & Q(**{f"{field}__{lookup}": value}))
+            preceding_equal &= Q(**{field: value})
+        return reduce(operator.or_, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for term in ordering:
+            field = term.lstrip("-")
+            value = instance[field] if isinstance(instance, dict) else getattr(instance, field)
+            values.append(str(value))
+        return json.dumps(values)
+
+
+class CursorOrPageNumberPagination(BasePagination):
+    """
+    Paginates with ``KeysetCursorPagination`` unless the client asks for a ``page``
+    number, which keeps page-number pagination available to admin-style clients
+    that need totals and random access.
+    """
+    cursor_pagination_class = KeysetCursorPagination
+    page_number_pagination_class = PageNumberPagination
+
+    def __init__(self):
+        self.paginator = self.cursor_pagination_class()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_number_pagination_class.page_query_param in request.query_params:
+            self.paginator = self.page_number_pagination_class()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    @property
+    def display_page_controls(self):
+        return self.paginator.display_page_controls
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            self.cursor_pagination_class().get_schema_operation_parameters(view)
+            + self.page_number_pagination_class().get_schema_operation_parameters(view)
+        )
@@ -0,0 +1,111 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Collapses literals and IN lists so that queries differing only in their
+# parameters share a fingerprint.
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_IN_LIST = re.compile(r"\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)")
+
+
+def fingerprint(sql):
+    sql = _LITERALS.sub("?", sql)
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """
+    ``connection.execute_wrapper`` that records the number of queries, the time
+    spent in the database and how often each query fingerprint ran. Unlike
+    ``connection.queries`` it works with ``DEBUG = False``.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Fingerprints that ran more than once, the signature of an N+1 query."""
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+
+@contextmanager
+def record_queries(using="default"):
+    recorder = QueryRecorder()
+    with connections[using].execute_wrapper(recorder):
+        yield recorder
+
+
+def get_query_budget(view_func, request):
+    """
+    Reads the ``query_budget`` a view declares, either a number for every action or
+    a dict keyed by viewset action (``{"list": 2, "retrieve": 2}``).
+    """
+    view_class = getattr(view_func, "cls", None)
+    budget = getattr(view_class, "query_budget", None)
+    if not isinstance(budget, dict):
+        return budget
+    actions = getattr(view_func, "actions", None) or {}
+    return budget.get(actions.get(request.method.lower()))
+
+
+class QueryBudgetMiddleware:
+    """
+    Records the queries made by each request, logs their count, database time and
+    duplicated fingerprints, and reports them in a ``Server-Timing`` header.
+
+    When the view declares a ``query_budget`` and the request goes over it, a warning
+    is logged, or ``QueryBudgetExceeded`` is raised if ``QUERY_BUDGET_STRICT`` is on,
+    which is how tests fail on a regression.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_budget = None
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        duplicates = recorder.duplicates
+        logger.info(
+            f"{request.path} executed {recorder.count} database queries "
+            f"in {recorder.duration * 1000:.1f}ms."
+        )
+        for sql, count in duplicates.items():
+            logger.warning(f"{request.path} repeated a query {count} times: {sql}")
+        response["Server-Timing"] = (
+            f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries, '
+            f'{sum(duplicates.values())} duplicated"'
+        )
+
+        budget = request.query_budget
+        if budget is not None and recorder.count > budget:
+            message = f"{request.method} {request.path} made {recorder.count} queries, its budget is {budget}."
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request)
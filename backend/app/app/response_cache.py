@@ -0,0 +1,169 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+KEY_PREFIX = "response-cache"
+CACHE_HEADER = "X-Cache"
+# Cached with the data, so hits can still answer conditional requests.
+VALIDATOR_HEADERS = ("ETag", "Last-Modified")
+
+
+def get_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def version_key(model):
+    return f"{KEY_PREFIX}:version:{model._meta.label_lower}"
+
+
+def new_version():
+    # Versions restart from the clock when a counter is evicted, never from a
+    # value that cached responses may already be keyed with.
+    return time.time_ns()
+
+
+def get_versions(models):
+    cache = get_cache()
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(models):
+    cache = get_cache()
+    for model in models:
+        try:
+            cache.incr(version_key(model))
+        except ValueError:
+            cache.set(version_key(model), new_version(), timeout=None)
+
+
+def invalidate_models(*models):
+    """
+    Invalidates the cached responses of every view depending on ``models``.
+
+    The versions are bumped right away and again once the current transaction
+    commits, so a response cached from the database in between, before the write
+    became visible, is never served.
+    """
+    bump_versions(models)
+    transaction.on_commit(lambda: bump_versions(models))
+
+
+def invalidate_on_write(model, also=()):
+    """Invalidates ``model``, and the models in ``also``, whenever one of its rows is saved or deleted."""
+    models = (model, *also)
+
+    def invalidate(sender, **kwargs):
+        invalidate_models(*models)
+
+    uid = f"{KEY_PREFIX}:{model._meta.label_lower}"
+    post_save.connect(invalidate, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(invalidate, sender=model, weak=False, dispatch_uid=uid)
+
+
+class ResponseCacheMetrics:
+    """Hits and misses by view, counted in the current process."""
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, view_name, hit):
+        with self._lock:
+            (self.hits if hit else self.misses)[view_name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {"hits": self.hits[name], "misses": self.misses[name]}
+                for name in sorted(self.hits.keys() | self.misses.keys())
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits.clear()
+            self.misses.clear()
+
+
+metrics = ResponseCacheMetrics()
+
+
+class CachedResponseMixin:
+    """
+    Read-through cache of the list and retrieve responses' data, in the Django
+    cache named by the ``RESPONSE_CACHE_ALIAS`` setting (local memory unless
+    configured otherwise) for ``RESPONSE_CACHE_TIMEOUT`` seconds.
+
+    Keys are built from the URL, query parameters included, and the version
+    counters of the view's ``cache_models``, which ``invalidate_on_write`` bumps on
+    every save and delete, so writes are seen by the next read. Writes made with
+    ``QuerySet.update`` or ``bulk_create`` send no signals and must call
+    ``invalidate_models`` themselves.
+
+    The ETag and Last-Modified headers of a response are cached with it, so hits
+    answer conditional requests with a 304 as well, see app.conditional.
+
+    Responses carry an ``X-Cache: hit|miss`` header, and hits and misses are
+    counted in ``metrics``. Disabled with the ``RESPONSE_CACHE`` setting.
+    """
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not getattr(settings, "RESPONSE_CACHE", True) or not self.cache_models:
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_response_cache_key(request)
+        entry = cache.get(key)
+        hit = entry is not None
+        if hit:
+            data, headers = entry
+            response = get_conditional_response(
+                request,
+                etag=headers.get("ETag"),
+                last_modified=parse_http_date_safe(headers.get("Last-Modified", "")),
+            ) or Response(data)
+            for header, value in headers.items():
+                response[header] = value
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                headers = {header: response[header] for header in VALIDATOR_HEADERS if header in response}
+                cache.set(key, (response.data, headers), getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300))
+        metrics.record(f"{self.basename}-{self.action}", hit)
+        response[CACHE_HEADER] = "hit" if hit else "miss"
+        return response
+
+    def get_response_cache_key(self, request):
+        # Pagination links are absolute, so the host is part of the key.
+        params = sorted((name, values) for name, values in request.query_params.lists())
+        versions = get_versions(self.cache_models)
+        digest = hashlib.sha256(repr((request.build_absolute_uri(request.path), params, versions)).encode())
+        return f"{KEY_PREFIX}:{type(self).__name__}:{self.action}:{digest.hexdigest()}"
+
+
+class ResponseCacheMetricsView(APIView):
+    """Hits and misses of the response cache by view, since this process started."""
+    def get(self, request):
+        return Response(metrics.snapshot())
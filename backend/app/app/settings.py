@@ -35,10 +35,17 @@ REST_FRAMEWORK = {
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,  # Default number of items per page
+    # The fast JSON renderer and parser use orjson when it is installed, see
+    # app/fast_json.py.
     "DEFAULT_RENDERER_CLASSES": (
-        "rest_framework.renderers.JSONRenderer",
+        "app.fast_json.FastJSONRenderer",
         "app.rest_framework_renderer.BrowsableAPIRendererWithoutForms",
     ),
+    "DEFAULT_PARSER_CLASSES": (
+        "app.fast_json.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 # Application definition
@@ -57,6 +64,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "app.query_budget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -64,9 +72,28 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "app.log_queries_middleware.QueryCountMiddleware",
 ]
 
+# Raise instead of logging when a view goes over its declared query_budget.
+QUERY_BUDGET_STRICT = False
+
+# Render list actions from .values() rows where the serializer allows it, see
+# app/fast_list.py.
+FAST_LIST_SERIALIZATION = True
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
+# Read-through cache of the catalog endpoints' responses, kept in the CACHES
+# alias below, see app/response_cache.py.
+RESPONSE_CACHE = True
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = 300
+
 ROOT_URLCONF = "app.urls"
 
 TEMPLATES = [
@@ -153,7 +180,7 @@ LOGGING = {
             "handlers": ["console"],
             "level": "INFO",
         },
-        "app.log_queries_middleware": {
+        "app.query_budget": {
             "handlers": ["console"],
             "level": "INFO",
         },
@@ -0,0 +1,102 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+
+def parse_field_names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Accepts a ``fields`` argument naming the fields to keep, all of them when it is
+    None. Only the serializer it is given to is trimmed, nested serializers keep
+    their own fields.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsetMixin:
+    """
+    Lets clients choose the fields of GET responses with ``?fields=a,b``, or leave
+    some out with ``?omit=a,b``. Unknown names are rejected with a 400.
+
+    The queryset only loads the model columns backing the requested fields, plus
+    the primary key and the columns the view orders by. Views skip the prefetches
+    and annotations of fields that were not requested by checking
+    ``is_field_requested``, and list the columns read by computed fields in
+    ``sparse_field_columns``.
+
+    Fields named in ``optional_fields`` are only rendered when ``?fields=`` asks for
+    them, so costly breakdowns stay out of the default responses.
+    """
+    sparse_field_columns = {}
+    optional_fields = []
+
+    @property
+    def requested_fields(self):
+        """The names of the fields to render, or None for all of them."""
+        if not hasattr(self, "_requested_fields"):
+            self._requested_fields = self.get_requested_fields()
+        return self._requested_fields
+
+    def get_requested_fields(self):
+        is_read = self.request is not None and self.request.method == "GET"
+        params = self.request.query_params if is_read else {}
+        if FIELDS_PARAM not in params and OMIT_PARAM not in params and not self.optional_fields:
+            return None
+
+        available = list(self.get_serializer_class()().fields)
+        requested = [name for name in available if name not in self.optional_fields]
+        errors = {}
+        for param in (FIELDS_PARAM, OMIT_PARAM):
+            names = parse_field_names(params.get(param, ""))
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                errors[param] = f"Unknown fields: {', '.join(unknown)}."
+            elif param == FIELDS_PARAM and param in params:
+                requested = [name for name in available if name in names]
+            elif param == OMIT_PARAM:
+                requested = [name for name in requested if name not in names]
+        if errors:
+            raise ValidationError(errors)
+        return requested
+
+    def is_field_requested(self, name):
+        return self.requested_fields is None or name in self.requested_fields
+
+    def get_serializer(self, *args, **kwargs):
+        if self.requested_fields is not None:
+            kwargs.setdefault("fields", self.requested_fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.requested_fields is None:
+            return queryset
+        return queryset.only(*self.get_sparse_columns(queryset.model))
+
+    def get_sparse_columns(self, model):
+        """The model columns needed to render the requested fields and page through them."""
+        fields = self.get_serializer_class()().fields
+        names = [model._meta.pk.name]
+        names += [term.lstrip("-") for term in getattr(self, "ordering", None) or []]
+        names += getattr(self, "ordering_fields", None) or []
+        for name in self.requested_fields:
+            names += self.sparse_field_columns.get(name, [fields[name].source.split(".")[0]])
+
+        columns = []
+        for name in names:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and field.name not in columns:
+                columns.append(field.name)
+        return columns
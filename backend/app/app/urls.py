@@ -18,8 +18,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from app.response_cache import ResponseCacheMetricsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("bookings/", include("bookings.urls")),
     path("companies/", include("companies.urls")),
+    path("metrics/response-cache/", ResponseCacheMetricsView.as_view(), name="response-cache-metrics"),
 ]
@@ -1,9 +1,8 @@
 from django.contrib import admin
 from django.contrib.admin import SimpleListFilter
-from django.db.models import F, Sum, Value
-from django.db.models.functions import Coalesce
+from django.db.models import Count
 
-from .models import Trip, Booking, Product, Message
+from .models import BOOKING_STATUS_CHOICES, Trip, Booking, Product, Message
 
 
 class MessageInline(admin.TabularInline):
@@ -33,28 +32,10 @@ class BookingStatusFilter(SimpleListFilter):
     parameter_name = "booking_status"
 
     def lookups(self, request, model_admin):
-        return [
-            ("no_bookings", "No Bookings"),
-            ("partially_booked", "Partially Booked"),
-            ("fully_booked", "Fully Booked"),
-            ("at_least_one", "At Least One Booking"),
-        ]
+        return BOOKING_STATUS_CHOICES
 
     def queryset(self, request, queryset):
-        queryset = queryset.annotate(
-            booked_pax_total=Coalesce(Sum("booking__pax", filter=F("booking__status") == Value("APPROVED")), 0)
-        )
-        lookup = self.value()
-
-        if lookup == "no_bookings":
-            return queryset.filter(booked_pax_total=0)
-        elif lookup == "partially_booked":
-            return queryset.filter(booked_pax_total__gt=0, booked_pax_total__lt=F("max_pax"))
-        elif lookup == "fully_booked":
-            return queryset.filter(booked_pax_total=F("max_pax"))
-        elif lookup == "at_least_one":
-            return queryset.filter(booked_pax_total__gt=0)
-        return queryset
+        return queryset.with_booking_status(self.value())
 
 
 @admin.register(Trip)
@@ -64,7 +45,7 @@ class TripAdmin(admin.ModelAdmin):
         "start_date",
         "end_date",
         "max_pax",
-        "booked_pax_display",
+        "booked_pax",
         "available_pax",
         "has_space",
         "is_full",
@@ -72,7 +53,7 @@ class TripAdmin(admin.ModelAdmin):
         "updated_at",
     )
     readonly_fields = (
-        "booked_pax_display",
+        "booked_pax",
         "available_pax",
         "has_space",
         "is_full",
@@ -86,19 +67,6 @@ class TripAdmin(admin.ModelAdmin):
     list_filter = ("product", BookingStatusFilter)
     ordering = ("start_date",)
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.annotate(
-            booked_pax_total=Coalesce(
-                Sum("booking__pax", filter=F("booking__status") == Value("APPROVED")), 0)
-        )
-
-    def booked_pax_display(self, obj):
-        return obj.booked_pax_total
-
-    booked_pax_display.admin_order_field = "booked_pax_total"
-    booked_pax_display.short_description = "Booked Pax"
-
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
@@ -127,13 +95,18 @@ class MessageAdmin(admin.ModelAdmin):
         "booking",
         "parent_message",
         "replies",
-        "booking",
+        "depth",
         "timestamp",
     )
-    readonly_fields = ("timestamp",)
+    readonly_fields = ("depth", "timestamp")
     search_fields = ("sender", "content")
     ordering = ("timestamp",)
     raw_id_fields = ("booking", "parent_message")
+    list_select_related = ("booking__trip__product", "parent_message")
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(replies_count=Count("replies"))
 
+    @admin.display(ordering="replies_count")
     def replies(self, obj):
-        return obj.replies.count()
+        return obj.replies_count
@@ -0,0 +1,188 @@
+import io
+import statistics
+import time
+import tracemalloc
+
+from django.test import Client, override_settings
+from django.urls import resolve, reverse
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from app.fast_json import FastJSONParser, FastJSONRenderer
+from app.query_budget import record_queries
+from companies.models import Company
+
+from .data_creation import DataGenerator, SeedData, SeedWriter
+from .models import Booking, Product, Trip
+
+# (name, url name, model whose first row is used for detail urls, query parameters)
+ENDPOINTS = [
+    ("bookings-list", "booking-list", None, {}),
+    ("bookings-list-summary", "booking-list", None, {"thread": "summary"}),
+    ("bookings-detail", "booking-detail", Booking, {}),
+    ("trips-list", "trip-list", None, {}),
+    ("trips-detail", "trip-detail", Trip, {}),
+    ("products-list", "product-list", None, {}),
+    ("products-detail", "product-detail", Product, {}),
+    ("companies-list", "company-list", None, {}),
+    ("companies-detail", "company-detail", Company, {}),
+]
+
+PRODUCTS_PER_BATCH = 10
+
+
+def build_dataset(num_bookings: int, thread_depth: int, seed: int = 0):
+    """
+    Seeds exactly ``num_bookings`` bookings, each with a reply chain of
+    ``thread_depth`` messages, using the seed data generator. The same seed gives
+    the same dataset.
+    """
+    generator = DataGenerator(seed=seed)
+    writer = SeedWriter()
+    remaining = num_bookings
+    while remaining:
+        data = SeedData()
+        data.companies, data.products = generator.companies_and_products(PRODUCTS_PER_BATCH)
+        data.trips = generator.trips(data.products)
+        data.bookings = generator.bookings(data.trips, limit=remaining)
+        data.messages = generator.reply_chains(data.bookings, thread_depth)
+        writer.write(data)
+        remaining -= len(data.bookings)
+    writer.finish()
+
+
+def percentile(samples: list[float], pct: int) -> float:
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1] if len(samples) > 1 else samples[0]
+
+
+def benchmark_endpoint(client: Client, url: str, iterations: int, params: dict | None = None) -> dict:
+    latencies = []
+    with record_queries() as recorder:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            response = client.get(url, params)
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, f"{url} returned {response.status_code}"
+
+    # Measured separately, tracemalloc slows down the requests it traces.
+    tracemalloc.start()
+    client.get(url, params)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "queries": recorder.count // iterations,
+        "peak_memory_kb": round(peak_memory / 1024, 1),
+        "payload_kb": round(len(response.content) / 1024, 1),
+    }
+
+
+def endpoint_url(url_name, model):
+    return reverse(url_name, args=[model.objects.order_by("pk").first().pk]) if model else reverse(url_name)
+
+
+@override_settings(RESPONSE_CACHE=False)
+def run_benchmarks(iterations: int) -> dict:
+    """Times every viewset list and detail endpoint against the current database."""
+    client = Client()
+    results = {}
+    for name, url_name, model, params in ENDPOINTS:
+        results[name] = benchmark_endpoint(client, endpoint_url(url_name, model), iterations, params)
+    return results
+
+
+@override_settings(RESPONSE_CACHE=True)
+def run_cache_benchmarks(iterations: int) -> dict:
+    """Times the endpoints of the views using app.response_cache once their response is cached."""
+    client = Client()
+    results = {}
+    for name, url_name, model, params in ENDPOINTS:
+        url = endpoint_url(url_name, model)
+        if not getattr(resolve(url).func.cls, "cache_models", None):
+            continue
+        client.get(url, params)
+        results[f"{name}-cached"] = benchmark_endpoint(client, url, iterations, params)
+    return results
+
+
+@override_settings(RESPONSE_CACHE=False)
+def run_list_path_benchmarks(iterations: int, page_sizes: list[int]) -> dict:
+    """
+    Times every list endpoint at each page size, rendered by the serializer and by
+    the fast .values() path of app.fast_list, after checking both give the same
+    bytes.
+    """
+    client = Client()
+    results = {}
+    for name, url_name, model, params in ENDPOINTS:
+        if model is not None:
+            continue
+        url = reverse(url_name)
+        for page_size in page_sizes:
+            page_params = {**params, "page_size": page_size}
+            contents = {}
+            for label, fast in (("serializer", False), ("fast", True)):
+                with override_settings(FAST_LIST_SERIALIZATION=fast):
+                    contents[label] = client.get(url, page_params).content
+                    results[f"{name}-{page_size}-{label}"] = benchmark_endpoint(client, url, iterations, page_params)
+            assert contents["fast"] == contents["serializer"], f"{url} renders differently on the fast path"
+    return results
+
+
+def time_calls(func, iterations: int) -> dict:
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+    }
+
+
+def run_json_benchmarks(iterations: int, page_size: int = 1000) -> dict:
+    """
+    Times rendering a page of bookings with their email threads, and parsing it
+    back, with DRF's stdlib JSON renderer and parser and with the fast ones.
+    """
+    client = Client()
+    data = client.get(reverse("booking-list"), {"page_size": page_size}).data
+    content = JSONRenderer().render(data)
+    assert FastJSONRenderer().render(data) == content, "The fast renderer renders bookings differently"
+
+    results = {}
+    for label, renderer, parser in (
+        ("stdlib", JSONRenderer(), JSONParser()),
+        ("fast", FastJSONRenderer(), FastJSONParser()),
+    ):
+        results[f"json-render-bookings-{label}"] = time_calls(lambda: renderer.render(data), iterations)
+        results[f"json-parse-bookings-{label}"] = time_calls(
+            lambda: parser.parse(io.BytesIO(content), parser_context={"encoding": "utf-8"}), iterations
+        )
+    results["json-render-bookings-fast"]["payload_kb"] = round(len(content) / 1024, 1)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Lists the metrics of ``results`` that got worse than ``baseline``: any extra
+    query, or latency, memory and payload size above the baseline by more than
+    ``tolerance`` (0.2 being 20%). Metrics missing from the baseline are skipped.
+    """
+    regressions = []
+    for dataset, endpoints in results.items():
+        for endpoint, metrics in endpoints.items():
+            expected = baseline.get(dataset, {}).get(endpoint)
+            if expected is None:
+                continue
+            for metric, value in metrics.items():
+                if metric not in expected:
+                    continue
+                limit = expected[metric] if metric == "queries" else expected[metric] * (1 + tolerance)
+                if value > limit:
+                    regressions.append(f"{dataset} {endpoint} {metric}: {value} (baseline {expected[metric]})")
+    return regressions
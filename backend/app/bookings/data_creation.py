@@ -1,119 +1,235 @@
-from django.db.models import QuerySet
-from faker import Faker
 import random
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from datetime import timedelta
+
+import django
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
 from django.utils import timezone
+from faker import Faker
+
+from app.response_cache import invalidate_models
 from bookings.models import Product, Trip, Booking, Message
+from bookings.threads import ThreadLinker, materialize_paths
 from companies.models import Company
 
-fake = Faker()
-
-
-def generate_conversation(
-        num_messages: int = 10,
-        participants: tuple = ("user", "admin"),
-        max_content_length: int = 200
-):
-    return [
-        {
-            "sender": random.choice(participants),
-            "content": fake.text(max_nb_chars=max_content_length),
-        }
-        for _ in range(num_messages)
-    ]
-
-
-def is_ancestor(possible_ancestor: Message, message: Message) -> bool:
-    def check_ancestor(current: Message) -> bool:
-        if current.parent_message is None:
-            return False
-        if current.parent_message == possible_ancestor:
-            return True
-        return check_ancestor(current.parent_message)
-
-    return check_ancestor(message)
-
-
-def create_companies_and_products(num_products: int, product_price_range: tuple[int, int] = (100, 1000)):
-    products = []
-    for i in range(num_products):
-        c, _ = Company.objects.get_or_create(
-            name=f"{fake.name().title()} {i}",
-            description=fake.text(max_nb_chars=100)
-        )
-        product = Product(
-            name=fake.catch_phrase(),
-            description=fake.text(max_nb_chars=200),
-            price=random.randint(*product_price_range),
-            company=c,
-        )
-        products.append(product)
-
-    return Product.objects.bulk_create(products)
-
-
-def create_trips(products: QuerySet[Product], pax_limit_range: tuple[int, int] = (5, 20), trips_per_product_range: tuple[int, int] = (50, 100)):
-    trips = []
-    for product in products:
-        pax_limit = random.randint(*pax_limit_range)
-        duration = timedelta(days=random.randint(1, 14))
-        number_of_trips = random.randint(*trips_per_product_range)
-        for trip in range(number_of_trips):
-            start_date = timezone.now().date() + timedelta(days=random.randint(1, 365))
-            end_date = start_date + duration
-            trips.append(
-                Trip(product=product, start_date=start_date, end_date=end_date, max_pax=pax_limit)
+BATCH_SIZE = 5000
+
+STATUS_CHOICES = ["PENDING", "APPROVED", "REJECTED"]
+
+
+@dataclass
+class SeedConfig:
+    product_price_range: tuple[int, int] = (100, 1000)
+    pax_limit_range: tuple[int, int] = (5, 20)
+    trips_per_product_range: tuple[int, int] = (50, 100)
+    empty_trip_percentage: float = 0.3
+    messages_per_booking: tuple[int, int] = (20, 50)
+    parent_message_percentage: float = 0.5
+    max_content_length: int = 200
+
+
+@dataclass
+class SeedData:
+    """Unsaved model instances, linked to each other through their relations."""
+    companies: list[Company] = field(default_factory=list)
+    products: list[Product] = field(default_factory=list)
+    trips: list[Trip] = field(default_factory=list)
+    bookings: list[Booking] = field(default_factory=list)
+    messages: list[Message] = field(default_factory=list)
+
+    def by_model(self):
+        """Yields each model with its instances, parents before children."""
+        yield Company, self.companies
+        yield Product, self.products
+        yield Trip, self.trips
+        yield Booking, self.bookings
+        yield Message, self.messages
+
+
+class DataGenerator:
+    """
+    Builds companies, products, trips, bookings and message threads in memory
+    without touching the database. The same seed always produces the same data.
+    """
+    def __init__(self, seed: int | None = None, config: SeedConfig | None = None):
+        self.config = config or SeedConfig()
+        self.random = random.Random(seed)
+        self.fake = Faker()
+        self.fake.seed_instance(seed)
+
+    def generate(self, num_products: int, with_messages: bool = True) -> SeedData:
+        data = SeedData()
+        data.companies, data.products = self.companies_and_products(num_products)
+        data.trips = self.trips(data.products)
+        data.bookings = self.bookings(data.trips)
+        if with_messages:
+            data.messages = self.messages(data.bookings)
+        return data
+
+    def companies_and_products(self, num_products: int) -> tuple[list[Company], list[Product]]:
+        companies, products = [], []
+        for i in range(num_products):
+            company = Company(
+                name=f"{self.fake.name().title()} {i}",
+                description=self.fake.text(max_nb_chars=100),
             )
-
-    return Trip.objects.bulk_create(trips)
-
-
-def create_bookings(trips: QuerySet[Trip], empty_trip_percentage: float = 0.3):
-    bookings = []
-    status_choices = ["PENDING", "APPROVED", "REJECTED"]
-
-    for trip in trips:
-        pax_count = 0
-        while random.random() > empty_trip_percentage:
-            pax_to_add = random.randint(1, trip.max_pax)
-            if pax_count + pax_to_add > trip.max_pax:
-                break
-            status = random.choice(status_choices)
-            set_to_approve = status == "APPROVED"
-            booking = Booking(
-                trip=trip,
-                pax=pax_to_add,
-                status="PENDING" if set_to_approve else status,
-            )
-            booking.save()
-            if set_to_approve:
-                booking.approve_booking()
-            bookings.append(booking)
-            pax_count += pax_to_add
-    return bookings
-
-
-def create_messages(
-        bookings: QuerySet[Booking],
-        messages_per_booking: tuple[int, int] = (20, 50),
-        parent_message_percentage: float = 0.5
-):
-    for booking in bookings:
-        conversation = generate_conversation(num_messages=random.randint(*messages_per_booking))
-        messages = [
+            companies.append(company)
+            products.append(Product(
+                name=self.fake.catch_phrase(),
+                description=self.fake.text(max_nb_chars=200),
+                price=self.random.randint(*self.config.product_price_range),
+                company=company,
+            ))
+        return companies, products
+
+    def trips(self, products: list[Product]) -> list[Trip]:
+        trips = []
+        today = timezone.now().date()
+        for product in products:
+            pax_limit = self.random.randint(*self.config.pax_limit_range)
+            duration = timedelta(days=self.random.randint(1, 14))
+            for _ in range(self.random.randint(*self.config.trips_per_product_range)):
+                start_date = today + timedelta(days=self.random.randint(1, 365))
+                trips.append(Trip(
+                    product=product,
+                    start_date=start_date,
+                    end_date=start_date + duration,
+                    max_pax=pax_limit,
+                ))
+        return trips
+
+    def bookings(self, trips: list[Trip], limit: int | None = None) -> list[Booking]:
+        """
+        Fills trips with bookings of random status, never beyond their max_pax, and
+        sets each trip's booked_pax to the pax of its approved bookings.
+        """
+        bookings = []
+        for trip in trips:
+            pax_count = 0
+            while self.random.random() > self.config.empty_trip_percentage:
+                if limit is not None and len(bookings) >= limit:
+                    return bookings
+                pax_to_add = self.random.randint(1, trip.max_pax)
+                if pax_count + pax_to_add > trip.max_pax:
+                    break
+                status = self.random.choice(STATUS_CHOICES)
+                bookings.append(Booking(trip=trip, pax=pax_to_add, status=status))
+                pax_count += pax_to_add
+                if status == "APPROVED":
+                    trip.booked_pax += pax_to_add
+        return bookings
+
+    def conversation(self, booking: Booking, num_messages: int, participants: tuple = ("user", "admin")) -> list[Message]:
+        return [
             Message(
                 booking=booking,
-                content=msg["content"],
-                sender=msg["sender"],
+                sender=self.random.choice(participants),
+                content=self.fake.text(max_nb_chars=self.config.max_content_length),
             )
-            for msg in conversation
+            for _ in range(num_messages)
         ]
-        msg_list = Message.objects.bulk_create(messages)
 
-        for msg in msg_list:
-            if random.random() < parent_message_percentage:
-                parent_message = random.choice(msg_list)
-                if parent_message != msg and not is_ancestor(msg, parent_message):
-                    msg.parent_message = parent_message
+    def messages(self, bookings: list[Booking]) -> list[Message]:
+        """Gives each booking a conversation whose messages randomly reply to one another."""
+        messages = []
+        for booking in bookings:
+            conversation = self.conversation(booking, self.random.randint(*self.config.messages_per_booking))
+            linker = ThreadLinker((position, None) for position in range(len(conversation)))
+            for position, message in enumerate(conversation):
+                if self.random.random() < self.config.parent_message_percentage:
+                    parent_position = self.random.randrange(len(conversation))
+                    if not linker.would_create_cycle(position, parent_position):
+                        linker.link(position, parent_position)
+                        message.parent_message = conversation[parent_position]
+            messages += conversation
+        return messages
+
+    def reply_chains(self, bookings: list[Booking], depth: int) -> list[Message]:
+        """Gives each booking a thread of ``depth`` messages, each a reply to the one before."""
+        messages = []
+        for booking in bookings:
+            parent = None
+            for message in self.conversation(booking, depth):
+                message.parent_message = parent
+                messages.append(message)
+                parent = message
+        return messages
+
+
+def generate_shard(seed: int | None, num_products: int, config: SeedConfig | None = None) -> SeedData:
+    return DataGenerator(seed=seed, config=config).generate(num_products)
+
+
+def shard_seeds(seed: int | None, num_shards: int) -> list[int | None]:
+    """
+    Derives one seed per shard, so a seeded dataset comes out the same whatever
+    the number of workers generating it.
+    """
+    if seed is None:
+        return [None] * num_shards
+    return [random.Random(seed * 1_000_003 + shard).getrandbits(64) for shard in range(num_shards)]
+
+
+def generate_shards(
+        shard_sizes: list[int],
+        seed: int | None = None,
+        workers: int = 1,
+        config: SeedConfig | None = None,
+) -> Iterator[SeedData]:
+    """
+    Yields a generated shard for each entry of ``shard_sizes`` (its number of
+    products), in order. With more than one worker the shards are generated by a
+    process pool, a couple of shards ahead of the consumer so memory stays bounded
+    when writing is the slower side.
+    """
+    seeds = shard_seeds(seed, len(shard_sizes))
+    if workers <= 1:
+        for shard_seed, size in zip(seeds, shard_sizes):
+            yield generate_shard(shard_seed, size, config)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+        pending = deque()
+        for shard_seed, size in zip(seeds, shard_sizes):
+            pending.append(executor.submit(generate_shard, shard_seed, size, config))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class SeedWriter:
+    """
+    Inserts generated data with batched bulk_create calls. Primary keys are
+    assigned up front, so related rows (including replies to messages in the same
+    batch) are linked, and message paths filled in, without any update pass.
+    """
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = batch_size
+        self.next_ids = {
+            model: (model.objects.aggregate(max_id=Max("pk"))["max_id"] or 0) + 1
+            for model, _ in SeedData().by_model()
+        }
 
-        Message.objects.bulk_update(msg_list, ["parent_message"])
+    def write(self, data: SeedData):
+        with transaction.atomic():
+            for model, objs in data.by_model():
+                for obj in objs:
+                    obj.pk = self.next_ids[model]
+                    self.next_ids[model] += 1
+                if model is Message:
+                    materialize_paths(objs)
+                model.objects.bulk_create(objs, batch_size=self.batch_size)
+            invalidate_models(*self.next_ids)
+
+    def finish(self):
+        """Moves the database sequences past the primary keys assigned by the writer."""
+        models = list(self.next_ids)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
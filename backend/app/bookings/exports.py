@@ -0,0 +1,37 @@
+import csv
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from .serializers import BookingSerializer
+
+EXPORT_CHUNK_SIZE = 500
+
+CSV_COLUMNS = ["id", "trip", "pax", "status", "created_at", "updated_at"]
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer that hands each written row back to the caller."""
+    def write(self, value):
+        return value
+
+
+def iter_ndjson(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields one JSON line per booking, including its email_thread. Bookings are read
+    with a server-side iterator and their messages prefetched a chunk at a time, so
+    memory stays bounded by the chunk size rather than the size of the export.
+    """
+    encoder = JSONEncoder()
+    serializer = BookingSerializer()
+    bookings = queryset.prefetch_related("messages").iterator(chunk_size=chunk_size)
+    for booking in bookings:
+        yield encoder.encode(serializer.to_representation(booking)) + "\n"
+
+
+def iter_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields the bookings as CSV lines, without their threads."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    rows = queryset.values_list("id", "trip_id", "pax", "status", "created_at", "updated_at")
+    for booking_id, trip_id, pax, status, created_at, updated_at in rows.iterator(chunk_size=chunk_size):
+        yield writer.writerow([booking_id, trip_id, pax, status, created_at.isoformat(), updated_at.isoformat()])
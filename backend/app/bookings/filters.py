@@ -0,0 +1,48 @@
+from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
+
+from .models import BOOKING_STATUS_CHOICES, CAPACITY_ANNOTATIONS, Booking, Trip
+
+
+class TripFilter(filters.FilterSet):
+    booking_status = filters.ChoiceFilter(choices=BOOKING_STATUS_CHOICES, method="filter_booking_status")
+    min_available_pax = filters.NumberFilter(
+        field_name=CAPACITY_ANNOTATIONS["available_pax"], lookup_expr="gte"
+    )
+    start_date = filters.DateFromToRangeFilter()
+    company = filters.NumberFilter(field_name="product__company")
+
+    class Meta:
+        model = Trip
+        fields = ["product", "company", "booking_status", "min_available_pax", "start_date"]
+
+    def filter_booking_status(self, queryset, name, value):
+        return queryset.with_booking_status(value)
+
+
+class BookingExportFilter(filters.FilterSet):
+    company = filters.NumberFilter(field_name="trip__product__company")
+    created = filters.DateFromToRangeFilter(field_name="created_at")
+
+    class Meta:
+        model = Booking
+        fields = ["trip", "company", "created"]
+
+
+class AliasedOrderingFilter(OrderingFilter):
+    """
+    Lets a view expose an ordering under its public field name while ordering by a
+    differently named annotation, declared in the view's ``ordering_aliases``.
+    """
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        aliases = getattr(view, "ordering_aliases", {})
+        return [self.resolve_alias(term, aliases) for term in ordering]
+
+    @staticmethod
+    def resolve_alias(term, aliases):
+        descending = term.startswith("-")
+        field = aliases.get(term.lstrip("-"), term.lstrip("-"))
+        return f"-{field}" if descending else field
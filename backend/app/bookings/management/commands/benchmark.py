@@ -0,0 +1,68 @@
+import json
+import logging
+
+from bookings.benchmarks import (
+    build_dataset,
+    compare,
+    run_benchmarks,
+    run_cache_benchmarks,
+    run_json_benchmarks,
+    run_list_path_benchmarks,
+)
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the API list and detail endpoints against seeded datasets of fixed size. "
+        "Runs in a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bookings", type=int, nargs="+", default=[1000], help="Dataset sizes to benchmark")
+        parser.add_argument("--thread-depths", type=int, nargs="+", default=[1, 20], help="Reply chain depths")
+        parser.add_argument("--iterations", type=int, default=20, help="Requests per endpoint")
+        parser.add_argument(
+            "--page-sizes", type=int, nargs="*", default=[20, 100, 1000],
+            help="Page sizes to time the serializer and fast list paths at, none to skip",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default="benchmark.json", help="Where to write the results")
+        parser.add_argument("--baseline", help="Results file to compare against")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown, 0.2 being 20%%")
+
+    def handle(self, *args, **options):
+        # The per-request query logging would drown out the results.
+        logging.getLogger("app.query_budget").setLevel(logging.ERROR)
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = {}
+            for num_bookings in options["bookings"]:
+                for depth in options["thread_depths"]:
+                    dataset = f"{num_bookings}-bookings-depth-{depth}"
+                    self.stdout.write(f"Building {dataset}.")
+                    call_command("flush", interactive=False, verbosity=0)
+                    build_dataset(num_bookings, depth, seed=options["seed"])
+                    results[dataset] = run_benchmarks(options["iterations"])
+                    results[dataset].update(run_cache_benchmarks(options["iterations"]))
+                    results[dataset].update(run_list_path_benchmarks(options["iterations"], options["page_sizes"]))
+                    results[dataset].update(run_json_benchmarks(options["iterations"]))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        with open(options["output"], "w") as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(f"Wrote results to {options['output']}.")
+
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                regressions = compare(results, json.load(f), options["tolerance"])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+            self.stdout.write("No regressions against the baseline.")
@@ -0,0 +1,14 @@
+from app.response_cache import invalidate_models
+from bookings.models import Trip
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = "Recalculate the stored booked_pax counter of every trip from its approved bookings"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Trip.objects.rebuild_booked_pax()
+            invalidate_models(Trip)
+        self.stdout.write(f"Rebuilt booked_pax for {updated} trips.")
@@ -1,29 +1,50 @@
-from bookings.models import Booking, Message, Product, Trip
+import time
+
+from bookings.data_creation import BATCH_SIZE, SeedWriter, generate_shards
+from bookings.models import Product
 from companies.models import Company
 from django.core.management.base import BaseCommand
-from bookings.data_creation import create_companies_and_products, create_trips, create_bookings, create_messages
+
+PRODUCTS_PER_SHARD = 50
 
 
 class Command(BaseCommand):
-    help = "Populate the database with N trips and varied booking levels"
+    help = "Populate the database with N products and a varied range of trips, bookings and messages"
 
     def add_arguments(self, parser):
-        parser.add_argument("N", type=int, help="Number of trips to create")
+        parser.add_argument("N", type=int, help="Number of products to create")
+        parser.add_argument("--seed", type=int, help="Random seed, the same seed gives the same data")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per INSERT")
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Processes generating data in parallel, rows are still written by this process",
+        )
+        parser.add_argument("--shard-size", type=int, default=PRODUCTS_PER_SHARD, help="Products per shard")
 
     def handle(self, *args, **options):
         num_products = options["N"]
+        shard_size = options["shard_size"]
+        shard_sizes = [min(shard_size, num_products - start) for start in range(0, num_products, shard_size)]
 
         Product.objects.all().delete()
         Company.objects.all().delete()
 
-        products = create_companies_and_products(num_products)
-        self.stdout.write(f"Created {len(products)} companies and products.")
-
-        trips = create_trips(products)
-        self.stdout.write(f"Created {len(trips)} trips.")
-
-        bookings = create_bookings(trips)
-        self.stdout.write(f"Created {len(bookings)} bookings.")
-
-        self.stdout.write("Creating messages.")
-        create_messages(bookings)
+        writer = SeedWriter(batch_size=options["batch_size"])
+        totals = dict.fromkeys(["companies", "products", "trips", "bookings", "messages"], 0)
+        started = time.monotonic()
+        # Each shard is written in its own transaction as soon as it is generated,
+        # so memory stays flat however many products are requested.
+        shards = generate_shards(shard_sizes, seed=options["seed"], workers=options["workers"])
+        for number, data in enumerate(shards, start=1):
+            writer.write(data)
+            for name in totals:
+                totals[name] += len(getattr(data, name))
+            elapsed = time.monotonic() - started
+            rows = sum(totals.values())
+            self.stdout.write(
+                f"Shard {number}/{len(shard_sizes)}: {totals['products']}/{num_products} products, "
+                f"{rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else rows:.0f} rows/s)."
+            )
+        writer.finish()
+
+        self.stdout.write(", ".join(f"{count} {name}" for name, count in totals.items()) + " created.")
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:34
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_booked_pax(apps, schema_editor):
+    Booking = apps.get_model("bookings", "Booking")
+    Trip = apps.get_model("bookings", "Trip")
+    approved_pax = (
+        Booking.objects.filter(trip=OuterRef("pk"), status="APPROVED")
+        .values("trip")
+        .annotate(total=Sum("pax"))
+        .values("total")
+    )
+    Trip.objects.update(booked_pax=Coalesce(Subquery(approved_pax), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0004_product_company"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="booked_pax",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_booked_pax, migrations.RunPython.noop),
+    ]
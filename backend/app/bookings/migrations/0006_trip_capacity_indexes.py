@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:41
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0005_trip_booked_pax"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["start_date"], name="trip_start_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["booked_pax"], name="trip_booked_pax_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(
+                django.db.models.expressions.CombinedExpression(
+                    models.F("max_pax"), "-", models.F("booked_pax")
+                ),
+                name="trip_available_pax_idx",
+            ),
+        ),
+    ]
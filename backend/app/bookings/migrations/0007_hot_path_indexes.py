@@ -0,0 +1,38 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0006_trip_capacity_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["created_at", "id"], name="booking_created_at_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["trip", "status", "pax"], name="booking_trip_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["booking", "parent_message", "timestamp"],
+                name="message_booking_thread_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(
+                fields=["product", "start_date"], name="trip_product_start_date_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0007_hot_path_indexes"),
+        ("companies", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["created_at", "id"], name="product_created_at_idx"
+            ),
+        ),
+    ]
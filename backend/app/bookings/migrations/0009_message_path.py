@@ -0,0 +1,68 @@
+# Generated by Django 5.1.2 on 2026-10-18 00:53
+
+from django.db import migrations, models
+
+SEGMENT_WIDTH = 10
+BATCH_SIZE = 1000
+
+
+def populate_paths(apps, schema_editor):
+    Message = apps.get_model("bookings", "Message")
+    # Only the reply links are held in memory, messages are rewritten in batches.
+    parents = dict(
+        Message.objects.values_list("id", "parent_message_id").iterator(
+            chunk_size=BATCH_SIZE
+        )
+    )
+
+    def path_and_depth(message_id):
+        chain = []
+        while message_id is not None:
+            chain.append(message_id)
+            message_id = parents[message_id]
+        return (
+            "".join(f"{ancestor:0{SEGMENT_WIDTH}d}" for ancestor in reversed(chain)),
+            len(chain) - 1,
+        )
+
+    batch = []
+    for message_id in parents:
+        path, depth = path_and_depth(message_id)
+        batch.append(Message(id=message_id, path=path, depth=depth))
+        if len(batch) == BATCH_SIZE:
+            Message.objects.bulk_update(batch, ["path", "depth"], batch_size=BATCH_SIZE)
+            batch = []
+    Message.objects.bulk_update(batch, ["path", "depth"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0008_product_created_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="depth",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="message",
+            name="path",
+            field=models.TextField(default="", editable=False),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["booking", "path"], name="message_booking_path_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["booking", "depth", "path"], name="message_booking_depth_idx"
+            ),
+        ),
+    ]
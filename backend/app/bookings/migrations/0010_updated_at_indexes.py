@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0009_message_path"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(fields=["updated_at"], name="booking_updated_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["updated_at"], name="trip_updated_at_idx"),
+        ),
+    ]
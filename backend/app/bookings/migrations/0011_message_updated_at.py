@@ -0,0 +1,26 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:32
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_timestamps(apps, schema_editor):
+    # Messages were never changed after they were posted, as far as anyone knows.
+    Message = apps.get_model("bookings", "Message")
+    Message.objects.update(updated_at=F("timestamp"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0010_updated_at_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_timestamps, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,46 @@
+from collections import Counter
+
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Substr
 from datetime import date
 
+from .threads import ThreadLinker, materialize_paths, path_range
 
 MININUM_MAX_PAX = 1
 
+BOOKING_STATUS_CHOICES = [
+    ("no_bookings", "No Bookings"),
+    ("partially_booked", "Partially Booked"),
+    ("fully_booked", "Fully Booked"),
+    ("at_least_one", "At Least One Booking"),
+]
+
+# Annotations added by TripQuerySet.with_capacity, keyed by the Trip property they mirror.
+CAPACITY_ANNOTATIONS = {
+    "booked_pax": "annotated_booked_pax",
+    "available_pax": "annotated_available_pax",
+    "has_space": "annotated_has_space",
+    "is_full": "annotated_is_full",
+}
+
+
+class CleanOnSaveModel(models.Model):
+    """
+    Runs full_clean before saving. Django REST does not call 'full_clean' in
+    ModelSerializers so adding here but usually this would go in a service
+    layer. Callers that already validated the instance, see
+    serializers.ValidationMixin, pass clean=False so the rules run once per write.
+    """
+    def save(self, *args, clean=True, **kwargs):
+        if clean:
+            self.full_clean()
+        super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
 
 class Product(models.Model):
     name = models.CharField(max_length=100)
@@ -17,15 +53,70 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="product_created_at_idx"),
+        ]
+
+
+class TripQuerySet(models.QuerySet):
+    def with_capacity(self):
+        """
+        Annotates the capacity properties of each trip so they are computed by the
+        database in the same query that loads the trips.
+        """
+        return self.annotate(**{
+            CAPACITY_ANNOTATIONS["booked_pax"]: F("booked_pax"),
+            CAPACITY_ANNOTATIONS["available_pax"]: ExpressionWrapper(
+                F("max_pax") - F("booked_pax"), output_field=IntegerField()
+            ),
+            CAPACITY_ANNOTATIONS["has_space"]: ExpressionWrapper(
+                Q(booked_pax__lt=F("max_pax")), output_field=BooleanField()
+            ),
+            CAPACITY_ANNOTATIONS["is_full"]: ExpressionWrapper(
+                Q(booked_pax__gte=F("max_pax")), output_field=BooleanField()
+            ),
+        })
 
-class Trip(models.Model):
+    def with_booking_status(self, booking_status):
+        """Filters trips by one of the BOOKING_STATUS_CHOICES, based on their approved pax."""
+        if booking_status == "no_bookings":
+            return self.filter(booked_pax=0)
+        elif booking_status == "partially_booked":
+            return self.filter(booked_pax__gt=0, booked_pax__lt=F("max_pax"))
+        elif booking_status == "fully_booked":
+            return self.filter(booked_pax__gte=F("max_pax"))
+        elif booking_status == "at_least_one":
+            return self.filter(booked_pax__gt=0)
+        return self
+
+    def adjust_booked_pax(self, delta):
+        return self.update(booked_pax=F("booked_pax") + delta)
+
+    def rebuild_booked_pax(self):
+        """Recomputes the stored booked_pax counter from the approved bookings."""
+        approved_pax = (
+            Booking.objects.filter(trip=OuterRef("pk"), status="APPROVED")
+            .values("trip")
+            .annotate(total=Sum("pax"))
+            .values("total")
+        )
+        return self.update(booked_pax=Coalesce(Subquery(approved_pax), 0))
+
+
+class Trip(CleanOnSaveModel):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     start_date = models.DateField()
     end_date = models.DateField()
     max_pax = models.IntegerField()
+    # Sum of the pax of the trip's approved bookings, kept up to date by
+    # Booking.save and the post_delete handler in signals.py.
+    booked_pax = models.IntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TripQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.product.name}: {self.start_date}—{self.end_date}"
 
@@ -37,13 +128,6 @@ class Trip(models.Model):
     def has_ended(self):
         return self.end_date < date.today()
 
-    @property
-    def booked_pax(self):
-        return sum(
-            booking.pax
-            for booking in self.booking_set.filter(status="APPROVED")
-        )
-
     @property
     def available_pax(self):
         return self.max_pax - self.booked_pax
@@ -67,15 +151,67 @@ class Trip(models.Model):
         if self.max_pax < MININUM_MAX_PAX:
             raise ValidationError({'max_pax': 'max_pax should have a value of at least 1.'})
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_bucket()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_bucket()
+
+    def _remember_bucket(self):
+        # The product and start date stored in the database, which companies.signals
+        # reads to find the rollup bucket a moved trip leaves.
+        if not {"product_id", "start_date"} & self.get_deferred_fields():
+            self._stored_bucket = (self.product_id, self.start_date)
+
     def save(self, *args, **kwargs):
-        # Django REST does not call 'full_clean' in ModelSerializers
-        # so adding here but usually this would go in a service
-        # layer.
-        self.full_clean()
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # booked_pax is maintained with F() updates, never write back a
+            # possibly stale in-memory value.
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "booked_pax"
+            ]
         super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        written = set(update_fields) if update_fields is not None else {"product", "start_date"}
+        if {"product", "start_date"} <= written:
+            self._remember_bucket()
+        elif {"product", "product_id", "start_date"} & written:
+            # Partly written, the stored bucket is no longer known.
+            self.__dict__.pop("_stored_bucket", None)
+
+    class Meta:
+        indexes = [
+            # Backs the date window filter and the capacity filters and orderings
+            # of TripViewSet.
+            models.Index(fields=["start_date"], name="trip_start_date_idx"),
+            models.Index(fields=["product", "start_date"], name="trip_product_start_date_idx"),
+            models.Index(fields=["booked_pax"], name="trip_booked_pax_idx"),
+            # Finds the trips changed since the last rollup refresh.
+            models.Index(fields=["updated_at"], name="trip_updated_at_idx"),
+            models.Index(F("max_pax") - F("booked_pax"), name="trip_available_pax_idx"),
+        ]
+
+
+class BookingQuerySet(models.QuerySet):
+    def with_thread_summary(self):
+        """
+        Annotates each booking with the size, latest activity and depth of its email
+        thread, in the same query. thread_depth counts the levels of messages, so a
+        thread without replies has a depth of 1 and an empty one 0.
+        """
+        return self.annotate(
+            message_count=Count("messages"),
+            last_message_at=Max("messages__timestamp"),
+            thread_depth=Coalesce(Max("messages__depth") + 1, 0),
+        )
 
 
-class Booking(models.Model):
+class Booking(CleanOnSaveModel):
     trip = models.ForeignKey(Trip, on_delete=models.CASCADE)
     pax = models.IntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
@@ -90,6 +226,8 @@ class Booking(models.Model):
         default="PENDING",
     )
 
+    objects = BookingQuerySet.as_manager()
+
     def can_approve_booking(self):
         has_space_for_booking = self.trip.available_pax >= self.pax
         if not has_space_for_booking:
@@ -101,12 +239,9 @@ class Booking(models.Model):
         return True
 
     def approve_booking(self):
-        try:
-            self.can_approve_booking()
-            self.status = "APPROVED"
-            self.save(update_fields=["status"])
-        except ValidationError as e:
-            raise e
+        from .services import approve_bookings
+
+        approve_bookings([self])
         return self
 
     def clean(self):
@@ -115,20 +250,73 @@ class Booking(models.Model):
         if not self.pk and self.status == "APPROVED":
             raise ValidationError({'status': "Booking status should be 'PENDING' or 'REJECTED' upon creation."})
 
+    def approved_pax_by_trip(self):
+        return Counter({self.trip_id: self.pax} if self.status == "APPROVED" else {})
+
     def save(self, *args, **kwargs):
-        # Django REST does not call 'full_clean' in ModelSerializers
-        # so adding here but usually this would go in a service
-        # layer.
-        self.full_clean()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Booking.objects.select_for_update().filter(pk=self.pk).first()
+            # Read by companies.signals, which needs the trip the booking leaves.
+            self._previous = previous
+            super().save(*args, **kwargs)
+            self._update_trip_booked_pax(previous, kwargs.get("update_fields"))
+
+    def _update_trip_booked_pax(self, previous, update_fields):
+        saved = self
+        if previous is not None and update_fields is not None:
+            # Only the listed fields were written, the rest keep their stored values.
+            saved = Booking(
+                trip_id=self.trip_id if {"trip", "trip_id"} & set(update_fields) else previous.trip_id,
+                pax=self.pax if "pax" in update_fields else previous.pax,
+                status=self.status if "status" in update_fields else previous.status,
+            )
+        deltas = saved.approved_pax_by_trip()
+        if previous is not None:
+            deltas.subtract(previous.approved_pax_by_trip())
+        for trip_id, delta in deltas.items():
+            if delta:
+                Trip.objects.filter(pk=trip_id).adjust_booked_pax(delta)
+        if Booking.trip.is_cached(self) and deltas.get(self.trip_id):
+            self.trip.refresh_from_db(fields=["booked_pax"])
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="booking_created_at_idx"),
+            # pax is included so the approved pax sums used to rebuild
+            # Trip.booked_pax are answered from the index alone.
+            models.Index(fields=["trip", "status", "pax"], name="booking_trip_status_idx"),
+            # Finds the bookings changed since the last rollup refresh.
+            models.Index(fields=["updated_at"], name="booking_updated_at_idx"),
+        ]
 
     def __str__(self):
         return f"{self.trip}: {self.pax} / {self.status}"
 
 
+class MessageQuerySet(models.QuerySet):
+    def thread(self, booking):
+        """The booking's messages, in thread order."""
+        return self.filter(booking=booking).order_by("path")
+
+    def subtree(self, message, max_depth=None):
+        """
+        The message and its replies, in thread order, down to ``max_depth`` levels
+        below it when given. A single range scan of the path index.
+        """
+        lower, upper = path_range(message.path)
+        queryset = self.filter(booking_id=message.booking_id, path__gte=lower, path__lt=upper)
+        if max_depth is not None:
+            queryset = queryset.filter(depth__lte=message.depth + max_depth)
+        return queryset.order_by("path")
+
+    def at_depth(self, depth):
+        """Messages ``depth`` replies away from the top of their thread, in thread order."""
+        return self.filter(depth=depth).order_by("booking", "path")
+
+
 class Message(models.Model):
     booking = models.ForeignKey(
         Booking, on_delete=models.CASCADE, related_name="messages"
@@ -142,10 +330,80 @@ class Message(models.Model):
     )
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Moves with any change, such as edits made in the admin, see the ETags of
+    # BookingViewSet and MessageViewSet.
+    updated_at = models.DateTimeField(auto_now=True)
     sender = models.CharField(max_length=100)
+    # The materialized path of the message in its thread and its distance from
+    # the top, see threads.py. Filled in by save, or materialize_paths for bulk
+    # inserts.
+    path = models.TextField(default="", editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = MessageQuerySet.as_manager()
+
+    def clean(self):
+        if self.parent_message_id is None:
+            return
+        if self.parent_message.booking_id != self.booking_id:
+            raise ValidationError({'parent_message': "Replies must belong to the same booking as their parent message."})
+        if self.pk:
+            linker = ThreadLinker(
+                Message.objects.filter(booking_id=self.booking_id).values_list("id", "parent_message_id")
+            )
+            if self.pk not in linker.parents:
+                # Moving to another booking, its replies follow it there on save.
+                linker.add(self.pk)
+            if linker.would_create_cycle(self.pk, self.parent_message_id):
+                raise ValidationError({'parent_message': "A message cannot reply to itself or to one of its replies."})
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = (
+                    Message.objects.select_for_update().filter(pk=self.pk)
+                    .values("booking_id", "parent_message_id", "path", "depth").first()
+                )
+            if previous is not None and kwargs.get("update_fields") is None:
+                # path and depth are rewritten for whole subtrees at once, never
+                # write back a possibly stale in-memory value.
+                kwargs["update_fields"] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in ("path", "depth")
+                ]
+            super().save(*args, **kwargs)
+            if previous is None:
+                self.path = ""
+                materialize_paths([self])
+                Message.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+            elif (previous["parent_message_id"], previous["booking_id"]) != (self.parent_message_id, self.booking_id):
+                self._move_subtree(previous["booking_id"], previous["path"], previous["depth"])
+
+    def _move_subtree(self, old_booking_id, old_path, old_depth):
+        self.path = ""
+        materialize_paths([self])
+        lower, upper = path_range(old_path)
+        # The message itself was just saved to its new booking, its replies are
+        # still in the old one.
+        bookings = {old_booking_id, self.booking_id}
+        Message.objects.filter(booking_id__in=bookings, path__gte=lower, path__lt=upper).update(
+            booking_id=self.booking_id,
+            path=Concat(Value(self.path), Substr("path", len(old_path) + 1), output_field=models.TextField()),
+            depth=F("depth") + self.depth - old_depth,
+        )
 
     def __str__(self):
         return f"Message by {self.sender} on {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
 
     class Meta:
         ordering = ["timestamp"]
+        indexes = [
+            models.Index(
+                fields=["booking", "parent_message", "timestamp"], name="message_booking_thread_idx"
+            ),
+            # Threads and subtrees are path ranges within a booking, replies at a
+            # given depth are read in thread order too.
+            models.Index(fields=["booking", "path"], name="message_booking_path_idx"),
+            models.Index(fields=["booking", "depth", "path"], name="message_booking_depth_idx"),
+        ]
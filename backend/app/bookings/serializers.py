@@ -1,25 +1,150 @@
+import copy
+from collections import Counter
+
+from django.db import transaction
 from rest_framework import serializers
 
-from .models import Booking, Product, Trip, Message
+from app.response_cache import invalidate_models
+from app.sparse_fieldsets import SparseFieldsetSerializerMixin
+from .models import CAPACITY_ANNOTATIONS, Booking, CleanOnSaveModel, Product, Trip, Message
+from .services import approve_bookings, booked_pax_deltas, set_booking_statuses
+from .threads import build_thread, render_thread
 from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.serializers import ValidationError
 
+# Upper bound on the messages returned for one subtree, however large the thread.
+MAX_SUBTREE_MESSAGES = 1000
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Looks related objects up in ``preloaded``, filled by ``BulkListSerializer``
+    with every object the items of a list refer to, before querying for them.
+    """
+    preloaded = None
+
+    def to_internal_value(self, data):
+        if self.preloaded is not None and self.pk_field is None:
+            try:
+                pk = self.get_queryset().model._meta.pk.to_python(data)
+            except DjangoValidationError:
+                pk = None
+            if pk in self.preloaded:
+                return self.preloaded[pk]
+        return super().to_internal_value(data)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Validates a list of objects with one query per related model: the objects the
+    items refer to are loaded together, then each item is validated in memory.
+    Errors are reported per item, as by ``ListSerializer``.
+
+    Saving inserts the items with a single ``bulk_create``, which skips the models'
+    ``save``: only models whose new rows need nothing beyond their validation can
+    use it, as bookings, created pending or rejected, and trips.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.preload_related(data)
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        instances = [model(**attrs) for attrs in validated_data]
+        with transaction.atomic():
+            model.objects.bulk_create(instances)
+            # bulk_create sends no post_save signals.
+            invalidate_models(model)
+        return instances
+
+    def preload_related(self, items):
+        for field in self.child.fields.values():
+            if not isinstance(field, PreloadedPrimaryKeyRelatedField) or field.read_only:
+                continue
+            pk_field = field.get_queryset().model._meta.pk
+            pks = set()
+            for item in items:
+                try:
+                    pks.add(pk_field.to_python(item.get(field.field_name)))
+                except (AttributeError, DjangoValidationError):
+                    continue
+            pks.discard(None)
+            field.preloaded = field.get_queryset().in_bulk(pks)
+
 
 class ValidationMixin:
     """
     Turns DjangoValidationErrors into DRF validation errors to allow for centralizing Model
     logic and constraints in one area.
+
+    The model rules run once per write: ``validate`` cleans the instance as it will
+    be saved, reusing the related objects the serializer fields loaded, and
+    ``create`` / ``update`` save it without cleaning it again. Related fields can be
+    preloaded in bulk when validating a list, see ``BulkListSerializer``.
     """
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
     def validate(self, data):
-        instance = self.Meta.model(**data)
+        if self.instance is not None:
+            # Clean the stored object with the changes applied, so partial
+            # updates are validated as a whole.
+            instance = copy.copy(self.instance)
+            for attr, value in data.items():
+                setattr(instance, attr, value)
+        else:
+            instance = self.Meta.model(**data)
+        # Foreign keys given in the data were already looked up by their fields,
+        # and those of a stored object were checked when it was saved.
+        exclude = [
+            field.name for field in self.Meta.model._meta.concrete_fields
+            if field.is_relation and (field.name in data or self.instance is not None)
+        ]
         try:
-            instance.full_clean()
+            instance.full_clean(exclude=exclude)
         except DjangoValidationError as e:
             raise ValidationError(e.message_dict)
         return data
 
+    def create(self, validated_data):
+        instance = self.Meta.model(**validated_data)
+        self.save_validated(instance)
+        return instance
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        self.save_validated(instance)
+        return instance
 
-class ProductSerializer(ValidationMixin, serializers.ModelSerializer):
+    def save_validated(self, instance):
+        if isinstance(instance, CleanOnSaveModel):
+            instance.save(clean=False)
+        else:
+            instance.save()
+
+
+class AnnotatedReadOnlyField(serializers.ReadOnlyField):
+    """
+    Reads a value annotated onto the instance by its queryset, falling back to the
+    model attribute of the same name when the annotation is missing.
+    """
+    def __init__(self, annotation, **kwargs):
+        self.annotation = annotation
+        super().__init__(**kwargs)
+
+    @property
+    def values_lookup(self):
+        # Read by app.fast_list when rendering .values() rows.
+        return self.annotation
+
+    def get_attribute(self, instance):
+        if self.annotation in instance.__dict__:
+            return instance.__dict__[self.annotation]
+        return super().get_attribute(instance)
+
+
+class ProductSerializer(SparseFieldsetSerializerMixin, ValidationMixin, serializers.ModelSerializer):
     company_name = serializers.ReadOnlyField(source="company.name")
 
     class Meta:
@@ -36,11 +161,12 @@ class ProductSerializer(ValidationMixin, serializers.ModelSerializer):
         read_only_fields = ["created_at", "updated_at"]
 
 
-class TripSerializer(ValidationMixin, serializers.ModelSerializer):
-    booked_pax = serializers.ReadOnlyField()
-    available_pax = serializers.ReadOnlyField()
-    has_space = serializers.ReadOnlyField()
-    is_full = serializers.ReadOnlyField()
+class TripSerializer(SparseFieldsetSerializerMixin, ValidationMixin, serializers.ModelSerializer):
+    # Read from TripQuerySet.with_capacity when listing, see TripViewSet.
+    booked_pax = AnnotatedReadOnlyField(CAPACITY_ANNOTATIONS["booked_pax"])
+    available_pax = AnnotatedReadOnlyField(CAPACITY_ANNOTATIONS["available_pax"])
+    has_space = AnnotatedReadOnlyField(CAPACITY_ANNOTATIONS["has_space"])
+    is_full = AnnotatedReadOnlyField(CAPACITY_ANNOTATIONS["is_full"])
 
     class Meta:
         model = Trip
@@ -58,21 +184,41 @@ class TripSerializer(ValidationMixin, serializers.ModelSerializer):
             "updated_at",
         ]
         read_only_fields = ["created_at", "updated_at"]
+        list_serializer_class = BulkListSerializer
 
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        # The capacity annotations describe the trip as it was loaded, drop them so
+        # the response uses the model properties.
+        for annotation in CAPACITY_ANNOTATIONS.values():
+            instance.__dict__.pop(annotation, None)
+        return instance
 
-class MessageSerializer(ValidationMixin, serializers.ModelSerializer):
-    replies = serializers.SerializerMethodField()
+
+class MessageSerializer(serializers.ModelSerializer):
+    """
+    Renders a message with its nested ``replies``. Expects the message to have been
+    linked by ``build_thread``; otherwise its subtree is loaded to do so.
+    """
 
     class Meta:
         model = Message
-        fields = ["id", "content", "timestamp", "sender", "replies"]
+        fields = ["id", "content", "timestamp", "sender"]
+
+    def to_representation(self, instance):
+        if not hasattr(instance, "thread_replies"):
+            instance = build_thread(Message.objects.subtree(instance))[0]
+        return render_thread([instance], super().to_representation)[0]
+
 
-    def get_replies(self, instance):
-        return MessageSerializer(instance.replies, many=True, context=self.context).data
+class MessageSubtreeQuerySerializer(serializers.Serializer):
+    """Query parameters of the message subtree endpoint."""
+    max_depth = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_SUBTREE_MESSAGES, default=MAX_SUBTREE_MESSAGES)
 
 
-class BookingSerializer(ValidationMixin, serializers.ModelSerializer):
-    email_thread = MessageSerializer(many=True, read_only=True, source='messages')
+class BookingSerializer(SparseFieldsetSerializerMixin, ValidationMixin, serializers.ModelSerializer):
+    email_thread = serializers.SerializerMethodField()
 
     class Meta:
         model = Booking
@@ -86,3 +232,99 @@ class BookingSerializer(ValidationMixin, serializers.ModelSerializer):
             "email_thread",
         ]
         read_only_fields = ["created_at", "updated_at"]
+        list_serializer_class = BulkListSerializer
+
+    def update(self, instance, validated_data):
+        if validated_data.get("status") != "APPROVED" or instance.status == "APPROVED":
+            return super().update(instance, validated_data)
+        # Approvals reserve their pax through approve_bookings, which checks the
+        # capacity left and only updates booked_pax while the booking still fits.
+        try:
+            with transaction.atomic():
+                instance = super().update(instance, {**validated_data, "status": instance.status})
+                approve_bookings([instance])
+        except DjangoValidationError as e:
+            raise ValidationError(e.message_dict)
+        return instance
+
+    def get_email_thread(self, instance):
+        # Relies on the booking's messages being prefetched in one query, see
+        # BookingViewSet.get_queryset.
+        roots = build_thread(instance.messages.all())
+        return MessageSerializer(roots, many=True, context=self.context).data
+
+
+class BookingStatusListSerializer(BulkListSerializer):
+    """
+    Checks the list as a whole once its items are valid: each booking is listed
+    once, and the bookings approved together fit in what is left of their trip.
+    """
+    def to_internal_value(self, data):
+        changes = super().to_internal_value(data)
+        listed = Counter(change["booking"].pk for change in changes)
+        deltas = booked_pax_deltas((change["booking"], change["status"]) for change in changes)
+        errors = []
+        for change in changes:
+            booking = change["booking"]
+            if listed[booking.pk] > 1:
+                errors.append({"booking": ["This booking is listed more than once."]})
+            elif change["status"] == "APPROVED" and deltas[booking.trip_id] > booking.trip.available_pax:
+                errors.append({"pax": ["Not enough space remaining for this trip."]})
+            else:
+                errors.append({})
+        if any(errors):
+            raise ValidationError(errors)
+        return changes
+
+    def create(self, validated_data):
+        try:
+            set_booking_statuses((change["booking"], change["status"]) for change in validated_data)
+        except DjangoValidationError as e:
+            raise ValidationError(e.message_dict)
+        return validated_data
+
+
+class BookingStatusSerializer(serializers.Serializer):
+    """
+    A booking's new status, for BookingViewSet.bulk_status. Approvals are checked as
+    by ``Booking.can_approve_booking``, other changes as by ``Booking.clean``.
+    """
+    booking = PreloadedPrimaryKeyRelatedField(queryset=Booking.objects.select_related("trip"))
+    status = serializers.ChoiceField(choices=Booking._meta.get_field("status").choices)
+
+    class Meta:
+        list_serializer_class = BookingStatusListSerializer
+
+    def validate(self, data):
+        booking = data["booking"]
+        try:
+            if data["status"] == "APPROVED":
+                booking.can_approve_booking()
+            else:
+                booking.clean()
+        except DjangoValidationError as e:
+            raise ValidationError(e.message_dict)
+        return data
+
+
+class BookingSummarySerializer(BookingSerializer):
+    """
+    Describes the email thread by its size, latest activity and depth instead of
+    embedding it. Expects a queryset annotated by ``with_thread_summary``.
+    """
+    message_count = serializers.IntegerField(read_only=True)
+    last_message_at = serializers.DateTimeField(read_only=True)
+    thread_depth = serializers.IntegerField(read_only=True)
+
+    class Meta(BookingSerializer.Meta):
+        fields = [
+            "id",
+            "trip",
+            "pax",
+            "status",
+            "created_at",
+            "updated_at",
+            "message_count",
+            "last_message_at",
+            "thread_depth",
+        ]
@@ -0,0 +1,115 @@
+import operator
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from app.response_cache import invalidate_models
+from .models import Booking, Trip
+
+
+def approve_bookings(bookings: Iterable[Booking]) -> list[Booking]:
+    """
+    Approves a batch of bookings for the same trip in a single transaction.
+
+    Capacity is reserved with one conditional update against the trip's booked_pax
+    counter, so concurrent approvals cannot overbook a trip: the database only
+    applies the increment when the whole batch still fits. Either every booking is
+    approved or none are.
+    """
+    bookings = list(bookings)
+    if not bookings:
+        return bookings
+    trip_ids = {booking.trip_id for booking in bookings}
+    if len(trip_ids) > 1:
+        raise ValidationError({'trip': 'Bookings approved together must belong to the same trip.'})
+    trip = bookings[0].trip
+
+    for booking in bookings:
+        booking.can_approve_booking()
+    total_pax = sum(booking.pax for booking in bookings)
+    if total_pax > trip.available_pax:
+        raise ValidationError({'pax': 'Not enough space remaining for this trip.'})
+
+    booking_ids = [booking.pk for booking in bookings]
+    with transaction.atomic():
+        approved = (
+            Booking.objects.filter(pk__in=booking_ids)
+            .exclude(status="APPROVED")
+            .update(status="APPROVED", updated_at=timezone.now())
+        )
+        if approved != len(bookings):
+            raise ValidationError({'status': 'This booking is already approved.'})
+        reserved = (
+            Trip.objects.filter(pk=trip.pk, booked_pax__lte=F("max_pax") - total_pax)
+            .adjust_booked_pax(total_pax)
+        )
+        if not reserved:
+            raise ValidationError({'pax': 'Not enough space remaining for this trip.'})
+        invalidate_models(Booking, Trip)
+
+    trip.refresh_from_db(fields=["booked_pax"])
+    for booking in bookings:
+        booking.status = "APPROVED"
+        booking.trip.booked_pax = trip.booked_pax
+    return bookings
+
+
+def booked_pax_deltas(changes: Iterable[tuple[Booking, str]]) -> Counter:
+    """How much moving each booking to its new status changes the booked_pax of its trip."""
+    deltas = Counter()
+    for booking, status in changes:
+        deltas.update(Booking(trip_id=booking.trip_id, pax=booking.pax, status=status).approved_pax_by_trip())
+        deltas.subtract(booking.approved_pax_by_trip())
+    return deltas
+
+
+def set_booking_statuses(changes: Iterable[tuple[Booking, str]]) -> list[Booking]:
+    """
+    Moves a batch of bookings, of any trips, to new statuses in a single transaction.
+
+    Expects the changes to have been validated, see BookingStatusListSerializer.
+    The bookings are updated with one query per pair of old and new status, and the
+    booked_pax of every trip with a single conditional update, which like
+    approve_bookings only applies when each trip still has room for its share of
+    the batch. Bookings changed concurrently, or a trip filled up in the meantime,
+    fail the whole batch.
+    """
+    changes = list(changes)
+    if not changes:
+        return []
+    transitions = defaultdict(list)
+    for booking, status in changes:
+        transitions[booking.status, status].append(booking.pk)
+    deltas = {trip_id: delta for trip_id, delta in booked_pax_deltas(changes).items() if delta}
+
+    now = timezone.now()
+    with transaction.atomic():
+        for (previous, status), booking_ids in transitions.items():
+            updated = (
+                Booking.objects.filter(pk__in=booking_ids, status=previous)
+                .update(status=status, updated_at=now)
+            )
+            if updated != len(booking_ids):
+                raise ValidationError({'status': 'These bookings were changed by another request, try again.'})
+        if deltas:
+            fits = reduce(operator.or_, (
+                Q(pk=trip_id, booked_pax__lte=F("max_pax") - max(delta, 0)) for trip_id, delta in deltas.items()
+            ))
+            reserved = Trip.objects.filter(fits).update(booked_pax=F("booked_pax") + Case(
+                *(When(pk=trip_id, then=Value(delta)) for trip_id, delta in deltas.items()),
+                default=Value(0),
+                output_field=models.IntegerField(),
+            ))
+            if reserved != len(deltas):
+                raise ValidationError({'pax': 'Not enough space remaining for this trip.'})
+        invalidate_models(Booking, Trip)
+
+    for booking, status in changes:
+        booking.status = status
+        booking.updated_at = now
+    return [booking for booking, _ in changes]
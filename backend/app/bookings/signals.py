@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from app.response_cache import invalidate_on_write
+from .models import Booking, Product, Trip
+
+invalidate_on_write(Product)
+invalidate_on_write(Trip)
+# Booking writes move their trip's booked_pax, and with it its capacity fields.
+invalidate_on_write(Booking, also=[Trip])
+
+
+@receiver(post_delete, sender=Booking)
+def release_booked_pax(sender, instance, **kwargs):
+    # Covers queryset and admin bulk deletes, which bypass Booking.delete.
+    for trip_id, pax in instance.approved_pax_by_trip().items():
+        Trip.objects.filter(pk=trip_id).adjust_booked_pax(-pax)
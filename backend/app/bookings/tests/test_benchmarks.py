@@ -0,0 +1,23 @@
+from django.test import TestCase
+
+from ..benchmarks import build_dataset, compare
+from ..models import Booking, Message
+
+
+class BenchmarkTest(TestCase):
+    def test_build_dataset_has_a_fixed_size(self):
+        build_dataset(num_bookings=5, thread_depth=3, seed=1)
+
+        self.assertEqual(Booking.objects.count(), 5)
+        self.assertEqual(Message.objects.count(), 15)
+        self.assertEqual(Message.objects.filter(parent_message=None).count(), 5)
+
+    def test_compare_reports_regressions(self):
+        baseline = {"small": {"bookings-list": {"p50_ms": 10.0, "queries": 2}}}
+        results = {"small": {"bookings-list": {"p50_ms": 11.0, "queries": 3}}}
+
+        self.assertEqual(
+            compare(results, baseline, tolerance=0.2),
+            ["small bookings-list queries: 3 (baseline 2)"],
+        )
+        self.assertEqual(compare(results, {}, tolerance=0.2), [])
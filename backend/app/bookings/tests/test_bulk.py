@@ -0,0 +1,196 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from app.response_cache import CACHE_HEADER, get_cache
+from companies.models import Company
+
+from ..models import Booking, Product, Trip
+from ..services import set_booking_statuses
+
+
+YEAR_IN_FUTURE = 3000
+
+
+class BulkTestMixin:
+    def setUp(self):
+        get_cache().clear()
+        company = Company.objects.create(name="Test Company")
+        self.product = Product.objects.create(
+            name="Test Product",
+            description="Test Product Description",
+            price=100.00,
+            company=company,
+        )
+        self.trips = [
+            Trip.objects.create(
+                product=self.product,
+                start_date=date(YEAR_IN_FUTURE, 1, day),
+                end_date=date(YEAR_IN_FUTURE, 1, 20),
+                max_pax=10,
+            )
+            for day in (1, 2)
+        ]
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class BulkCreateTest(BulkTestMixin, APITestCase):
+    def test_bookings_are_created_with_one_insert(self):
+        data = [{"trip": trip.id, "pax": pax} for trip in self.trips for pax in (1, 2, 3)]
+
+        # Trips, savepoint, insert, release, and the (empty) email threads.
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse("booking-bulk-create"), data, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Booking.objects.count(), 6)
+        self.assertEqual([booking["id"] for booking in response.data], list(
+            Booking.objects.order_by("id").values_list("id", flat=True)
+        ))
+        self.assertEqual(response.data[0]["status"], "PENDING")
+        self.assertEqual(response.data[0]["email_thread"], [])
+
+    def test_errors_are_reported_per_item_and_nothing_is_created(self):
+        Trip.objects.filter(pk=self.trips[1].pk).update(start_date=date(2020, 1, 1), end_date=date(2020, 1, 2))
+        data = [
+            {"trip": self.trips[0].id, "pax": 1},
+            {"trip": 999, "pax": 1},
+            {"trip": self.trips[1].id, "pax": 1},
+            {"trip": self.trips[0].id, "pax": 1, "status": "APPROVED"},
+        ]
+        response = self.client.post(reverse("booking-bulk-create"), data, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("trip", response.data[1])
+        self.assertIn("trip", response.data[2])
+        self.assertIn("status", response.data[3])
+        self.assertFalse(Booking.objects.exists())
+
+    def test_trips(self):
+        data = [
+            {"product": self.product.id, "start_date": date(YEAR_IN_FUTURE, 2, day),
+             "end_date": date(YEAR_IN_FUTURE, 2, 20), "max_pax": 4}
+            for day in (1, 2)
+        ]
+        response = self.client.post(reverse("trip-bulk-create"), data, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data[0]["available_pax"], 4)
+        self.assertEqual(Trip.objects.filter(max_pax=4).count(), 2)
+
+    def test_created_trips_are_listed_from_the_cache_afterwards(self):
+        self.client.get(reverse("trip-list"))
+        data = [{
+            "product": self.product.id, "start_date": date(YEAR_IN_FUTURE, 2, 1),
+            "end_date": date(YEAR_IN_FUTURE, 2, 20), "max_pax": 4,
+        }]
+        self.client.post(reverse("trip-bulk-create"), data, format="json")
+
+        response = self.client.get(reverse("trip-list"))
+        self.assertEqual(response[CACHE_HEADER], "miss")
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_body_must_be_a_non_empty_list(self):
+        url = reverse("booking-bulk-create")
+        self.assertEqual(self.client.post(url, {"trip": self.trips[0].id, "pax": 1}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, [], format="json").status_code, 400)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class BulkStatusTest(BulkTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.bookings = [Booking.objects.create(trip=trip, pax=pax) for trip in self.trips for pax in (4, 5)]
+
+    def post(self, changes):
+        data = [{"booking": booking.id, "status": status} for booking, status in changes]
+        return self.client.post(reverse("booking-bulk-status"), data, format="json")
+
+    def test_bookings_of_several_trips_are_updated_together(self):
+        changes = [(booking, "APPROVED") for booking in self.bookings[:3]] + [(self.bookings[3], "REJECTED")]
+
+        # Bookings with their trips, savepoint, one update per status, trips, release.
+        with self.assertNumQueries(6):
+            response = self.post(changes)
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data[3], {"booking": self.bookings[3].id, "status": "REJECTED"})
+        self.assertEqual(
+            list(Booking.objects.order_by("id").values_list("status", flat=True)),
+            ["APPROVED", "APPROVED", "APPROVED", "REJECTED"],
+        )
+        self.assertEqual(
+            list(Trip.objects.order_by("start_date").values_list("booked_pax", flat=True)), [9, 4]
+        )
+
+    def test_capacity_is_checked_for_the_bookings_of_a_trip_together(self):
+        Booking.objects.create(trip=self.trips[0], pax=2)
+        self.bookings[0].approve_booking()
+
+        # 5 pax fit in the 6 left, the 2 pending after them do not.
+        response = self.post([(self.bookings[1], "APPROVED"), (Booking.objects.last(), "APPROVED")])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, [
+            {"pax": ["Not enough space remaining for this trip."]},
+            {"pax": ["Not enough space remaining for this trip."]},
+        ])
+        self.assertEqual(Trip.objects.get(pk=self.trips[0].pk).booked_pax, 4)
+
+        # Rejecting the approved booking makes room for both.
+        response = self.post([
+            (self.bookings[0], "REJECTED"), (self.bookings[1], "APPROVED"), (Booking.objects.last(), "APPROVED"),
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(Trip.objects.get(pk=self.trips[0].pk).booked_pax, 7)
+
+    def test_errors_are_reported_per_item(self):
+        self.bookings[2].approve_booking()
+        response = self.post([
+            (self.bookings[0], "APPROVED"),
+            (self.bookings[2], "APPROVED"),
+            (self.bookings[0], "REJECTED"),
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[1], {"status": ["This booking is already approved."]})
+        self.assertFalse(Booking.objects.filter(pk=self.bookings[0].pk, status="APPROVED").exists())
+
+        response = self.post([(self.bookings[0], "APPROVED"), (self.bookings[0], "REJECTED")])
+        self.assertEqual(response.data[0], {"booking": ["This booking is listed more than once."]})
+
+    def test_approvals_invalidate_cached_trips(self):
+        url = reverse("trip-detail", args=[self.trips[0].id])
+        self.client.get(url)
+
+        self.post([(self.bookings[0], "APPROVED")])
+        self.assertEqual(self.client.get(url).data["available_pax"], 6)
+
+
+class SetBookingStatusesTest(BulkTestMixin, TestCase):
+    def test_stale_capacity_fails_the_whole_batch(self):
+        trip = self.trips[0]
+        first = Booking.objects.create(trip=trip, pax=6)
+        second = Booking.objects.create(trip=self.trips[1], pax=1)
+        Booking.objects.create(trip=Trip.objects.get(pk=trip.pk), pax=5).approve_booking()
+
+        # first.trip still believes the trip is empty.
+        with self.assertRaises(ValidationError) as context:
+            set_booking_statuses([(first, "APPROVED"), (second, "APPROVED")])
+
+        self.assertIn("pax", context.exception.error_dict)
+        self.assertEqual(Booking.objects.filter(status="APPROVED").count(), 1)
+        self.assertEqual(Trip.objects.get(pk=self.trips[1].pk).booked_pax, 0)
+
+    def test_concurrent_status_changes_fail_the_whole_batch(self):
+        booking = Booking.objects.create(trip=self.trips[0], pax=1)
+        Booking.objects.filter(pk=booking.pk).update(status="REJECTED")
+
+        with self.assertRaises(ValidationError) as context:
+            set_booking_statuses([(booking, "APPROVED")])
+
+        self.assertIn("status", context.exception.error_dict)
+        self.assertEqual(Trip.objects.get(pk=self.trips[0].pk).booked_pax, 0)
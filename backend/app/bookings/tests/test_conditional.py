@@ -0,0 +1,214 @@
+from datetime import date
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from app.response_cache import CACHE_HEADER, get_cache
+from companies.models import Company
+from companies.rollups import refresh_daily_rollups
+
+from ..models import Booking, Message, Product, Trip
+
+
+YEAR_IN_FUTURE = 3000
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, RESPONSE_CACHE=False)
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Test Company")
+        self.product = Product.objects.create(
+            name="Test Product",
+            description="Test Product Description",
+            price=100.00,
+            company=self.company,
+        )
+        self.trip = Trip.objects.create(
+            product=self.product,
+            start_date=date(YEAR_IN_FUTURE, 1, 1),
+            end_date=date(YEAR_IN_FUTURE, 1, 20),
+            max_pax=10,
+        )
+        self.booking = Booking.objects.create(trip=self.trip, pax=2)
+
+    def assertNotModified(self, url, etag, **params):
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_matching_etag_is_answered_without_a_body(self):
+        url = reverse("product-list")
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(1):
+            self.assertNotModified(url, etag)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_etag_depends_on_the_rendered_fields_and_page(self):
+        url = reverse("product-list")
+        etag = self.client.get(url)["ETag"]
+        self.assertNotEqual(self.client.get(url, {"fields": "id"})["ETag"], etag)
+
+        self.company.name = "Renamed"
+        self.company.save()
+        self.assertNotModified(url, self.client.get(url, {"fields": "id"})["ETag"], fields="id")
+        self.assertNotEqual(self.client.get(url)["ETag"], etag)
+
+    def test_rows_added_after_the_page_change_the_etag(self):
+        url = reverse("product-list")
+        etag = self.client.get(url, {"page_size": 1})["ETag"]
+        self.assertNotModified(url, etag, page_size=1)
+
+        Product.objects.create(name="Later", description="Description", price=100.00, company=self.company)
+        response = self.client.get(url, {"page_size": 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data["next"])
+
+    def test_rows_added_after_the_page_change_the_page_number_etag(self):
+        Product.objects.bulk_create([
+            Product(name=f"Product {number}", description="Description", price=100.00, company=self.company)
+            for number in range(19)
+        ])
+        url = reverse("product-list")
+        etag = self.client.get(url, {"page": 1})["ETag"]
+        self.assertNotModified(url, etag, page=1)
+
+        Product.objects.create(name="Later", description="Description", price=100.00, company=self.company)
+        response = self.client.get(url, {"page": 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 21)
+
+    def test_updates_change_the_etag(self):
+        url = reverse("product-detail", args=[self.product.id])
+        etag = self.client.get(url)["ETag"]
+
+        self.client.patch(url, {"name": "Renamed"})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["name"], "Renamed")
+
+    def test_approving_a_booking_changes_the_trip_etag(self):
+        url = reverse("trip-list")
+        etag = self.client.get(url)["ETag"]
+        self.assertNotModified(url, etag)
+
+        self.booking.approve_booking()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_is_answered_on_if_modified_since(self):
+        url = reverse("product-detail", args=[self.product.id])
+        response = self.client.get(url)
+        last_modified = response["Last-Modified"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_details_with_counters_have_no_last_modified(self):
+        # booked_pax and the message count change without moving updated_at.
+        message = Message.objects.create(booking=self.booking, content="Question", sender="user")
+        trip_url = reverse("trip-detail", args=[self.trip.id])
+        booking_url = reverse("booking-detail", args=[self.booking.id])
+        message_url = reverse("message-detail", args=[message.id])
+        for url in (trip_url, booking_url, message_url):
+            self.assertNotIn("Last-Modified", self.client.get(url))
+
+        self.booking.approve_booking()
+        message.delete()
+        for url in (trip_url, booking_url):
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT")
+            self.assertEqual(response.status_code, 200)
+
+    def test_new_messages_change_the_booking_etag(self):
+        url = reverse("booking-detail", args=[self.booking.id])
+        etag = self.client.get(url)["ETag"]
+
+        Message.objects.create(booking=self.booking, content="Question", sender="user")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["email_thread"]), 1)
+
+    def test_edited_messages_change_the_etags(self):
+        root = Message.objects.create(booking=self.booking, content="Question", sender="user")
+        booking_url = reverse("booking-detail", args=[self.booking.id])
+        message_url = reverse("message-detail", args=[root.id])
+        booking_etag = self.client.get(booking_url)["ETag"]
+        message_etag = self.client.get(message_url)["ETag"]
+
+        root.content = "Edited"
+        root.save()
+        response = self.client.get(booking_url, HTTP_IF_NONE_MATCH=booking_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["email_thread"][0]["content"], "Edited")
+        self.assertEqual(self.client.get(message_url, HTTP_IF_NONE_MATCH=message_etag).status_code, 200)
+
+    def test_missing_object_is_not_found(self):
+        url = reverse("booking-detail", args=[self.booking.id + 1])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH="*").status_code, 404)
+
+    def test_new_bookings_change_the_company_etag(self):
+        url = reverse("company-list")
+        etag = self.client.get(url)["ETag"]
+        self.assertNotModified(url, etag)
+
+        Booking.objects.create(trip=self.trip, pax=1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["total_bookings"], 2)
+
+    def test_refreshing_rollups_changes_their_etag(self):
+        refresh_daily_rollups()
+        url = reverse("dailyrollup-list")
+        etag = self.client.get(url)["ETag"]
+        self.assertNotModified(url, etag)
+
+        self.booking.approve_booking()
+        refresh_daily_rollups()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_message_subtree(self):
+        root = Message.objects.create(booking=self.booking, content="Question", sender="user")
+        url = reverse("message-detail", args=[root.id])
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(2):
+            self.assertNotModified(url, etag)
+
+        Message.objects.create(booking=self.booking, content="Answer", sender="admin", parent_message=root)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["replies"]), 1)
+
+    def test_writes_are_not_conditional(self):
+        url = reverse("product-detail", args=[self.product.id])
+        etag = self.client.get(url)["ETag"]
+        response = self.client.patch(url, {"name": "Renamed"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class CachedConditionalGetTest(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        company = Company.objects.create(name="Test Company")
+        Product.objects.create(name="Test Product", description="Description", price=100.00, company=company)
+
+    def test_cache_hits_are_answered_without_queries(self):
+        url = reverse("product-list")
+        etag = self.client.get(url)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response[CACHE_HEADER], "hit")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], etag)
@@ -0,0 +1,80 @@
+from django.db.models import F, Max
+from django.test import TestCase
+
+from ..data_creation import DataGenerator, SeedConfig, SeedWriter, generate_shards
+from ..models import Booking, Message, Trip
+from ..threads import path_segment
+
+SMALL = SeedConfig(trips_per_product_range=(2, 4), messages_per_booking=(2, 6))
+
+
+class DataGeneratorTest(TestCase):
+    def test_same_seed_generates_same_data(self):
+        first = DataGenerator(seed=7, config=SMALL).generate(3)
+        second = DataGenerator(seed=7, config=SMALL).generate(3)
+
+        self.assertEqual([c.name for c in first.companies], [c.name for c in second.companies])
+        self.assertEqual(
+            [(b.pax, b.status) for b in first.bookings], [(b.pax, b.status) for b in second.bookings]
+        )
+        self.assertEqual([m.content for m in first.messages], [m.content for m in second.messages])
+
+    def test_bookings_respect_capacity(self):
+        data = DataGenerator(seed=3, config=SMALL).generate(5, with_messages=False)
+
+        for trip in data.trips:
+            approved = [b for b in data.bookings if b.trip is trip and b.status == "APPROVED"]
+            self.assertEqual(trip.booked_pax, sum(b.pax for b in approved))
+            self.assertLessEqual(trip.booked_pax, trip.max_pax)
+
+    def test_parallel_generation_matches_serial_generation(self):
+        def summary(shards):
+            return [
+                ([c.name for c in data.companies], [b.pax for b in data.bookings], [m.content for m in data.messages])
+                for data in shards
+            ]
+
+        serial = summary(generate_shards([2, 1, 2], seed=5, config=SMALL))
+        parallel = summary(generate_shards([2, 1, 2], seed=5, workers=2, config=SMALL))
+
+        self.assertEqual(len(serial), 3)
+        self.assertEqual(serial, parallel)
+
+
+class SeedWriterTest(TestCase):
+    def test_writes_linked_rows_in_bulk(self):
+        data = DataGenerator(seed=1, config=SMALL).generate(3)
+        writer = SeedWriter(batch_size=10)
+
+        inserts = sum(-(-len(objs) // 10) for _, objs in data.by_model())
+        # Plus the savepoint around the write.
+        with self.assertNumQueries(inserts + 2):
+            writer.write(data)
+        writer.finish()
+
+        self.assertEqual(Booking.objects.count(), len(data.bookings))
+        self.assertEqual(Message.objects.count(), len(data.messages))
+        self.assertEqual(
+            Message.objects.exclude(parent_message=None).count(),
+            sum(1 for m in data.messages if m.parent_message is not None),
+        )
+        self.assertFalse(Message.objects.exclude(parent_message__booking=F("booking")).exclude(
+            parent_message=None
+        ).exists())
+        paths = {pk: (path, depth) for pk, path, depth in Message.objects.values_list("pk", "path", "depth")}
+        for pk, parent_pk in Message.objects.values_list("pk", "parent_message_id"):
+            parent_path, parent_depth = paths[parent_pk] if parent_pk else ("", -1)
+            self.assertEqual(paths[pk], (parent_path + path_segment(pk), parent_depth + 1))
+        stored = dict(Trip.objects.values_list("pk", "booked_pax"))
+        Trip.objects.rebuild_booked_pax()
+        self.assertEqual(dict(Trip.objects.values_list("pk", "booked_pax")), stored)
+
+    def test_later_writes_continue_after_existing_rows(self):
+        writer = SeedWriter()
+        writer.write(DataGenerator(seed=1, config=SMALL).generate(1, with_messages=False))
+        writer.write(DataGenerator(seed=2, config=SMALL).generate(1, with_messages=False))
+        writer.finish()
+
+        max_pk = Booking.objects.aggregate(max_pk=Max("pk"))["max_pk"]
+        booking = Booking.objects.create(trip=Trip.objects.first(), pax=1)
+        self.assertGreater(booking.pk, max_pk)
@@ -0,0 +1,58 @@
+import io
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from app import fast_json
+from app.fast_json import FastJSONParser, FastJSONRenderer
+
+PAYLOAD = ReturnDict({
+    "price": Decimal("99.90"),
+    "created_at": datetime(2030, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+    "local": datetime(2030, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=2))),
+    "naive": datetime(2030, 1, 2, 3, 4, 5),
+    "start_date": date(2030, 1, 2),
+    "duration": timedelta(days=1, seconds=30),
+    "id": uuid.UUID(int=1),
+    "content": "Café\u2028\u2029 \"quoted\" \u2603",
+    "counts": {1: 2},
+    "replies": [{"empty": None, "ratio": 0.1, "flag": True}],
+}, serializer=None)
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    def test_renders_the_same_bytes_as_the_stdlib_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD))
+
+    def test_falls_back_without_orjson_and_for_indented_output(self):
+        with mock.patch.object(fast_json, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD))
+
+        context = {"indent": 4}
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD, renderer_context=context),
+            JSONRenderer().render(PAYLOAD, renderer_context=context),
+        )
+
+
+class FastJSONParserTest(SimpleTestCase):
+    def parse(self, parser, body, encoding="utf-8"):
+        return parser.parse(io.BytesIO(body), parser_context={"encoding": encoding})
+
+    def test_parses_like_the_stdlib_parser(self):
+        body = '{"pax": 2, "content": "Café", "ratio": 0.5, "items": [null, true]}'.encode()
+        self.assertEqual(self.parse(FastJSONParser(), body), self.parse(JSONParser(), body))
+
+        latin1 = '{"content": "Café"}'.encode("latin-1")
+        self.assertEqual(self.parse(FastJSONParser(), latin1, "latin-1"), {"content": "Café"})
+
+    def test_invalid_json_is_a_parse_error(self):
+        with self.assertRaises(ParseError):
+            self.parse(FastJSONParser(), b'{"pax": ')
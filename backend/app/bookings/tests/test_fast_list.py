@@ -0,0 +1,78 @@
+from datetime import date
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from app import fast_list
+from companies.models import Company
+
+from ..models import Booking, Message, Product, Trip
+
+YEAR_IN_FUTURE = 3000
+
+
+# Both paths are requested with the same URLs, which the response cache would answer.
+@override_settings(RESPONSE_CACHE=False)
+class FastListTest(APITestCase):
+    def setUp(self):
+        for i in range(3):
+            company = Company.objects.create(name=f"Company {i}", description="")
+            product = Product.objects.create(
+                name=f"Product {i}", description="Description", price="99.90", company=company
+            )
+            for day in range(1, 4):
+                trip = Trip.objects.create(
+                    product=product,
+                    start_date=date(YEAR_IN_FUTURE, 1, day),
+                    end_date=date(YEAR_IN_FUTURE, 1, 20),
+                    max_pax=5 + day,
+                )
+                booking = Booking.objects.create(trip=trip, pax=day)
+                booking.approve_booking()
+                Message.objects.create(booking=booking, content="Question", sender="user")
+
+    def get(self, url_name, params, fast):
+        with override_settings(FAST_LIST_SERIALIZATION=fast):
+            with mock.patch.object(fast_list, "render_rows", wraps=fast_list.render_rows) as render_rows:
+                response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200)
+        return response, render_rows.called
+
+    def test_output_is_identical_to_the_serializer(self):
+        cases = [
+            ("trip-list", {}),
+            ("trip-list", {"ordering": "-available_pax", "page_size": 4}),
+            ("product-list", {}),
+            ("product-list", {"fields": "id,price,company_name"}),
+            ("booking-list", {"thread": "summary"}),
+            ("booking-list", {"omit": "email_thread"}),
+            ("company-list", {"omit": "total_bookings"}),
+        ]
+        for url_name, params in cases:
+            with self.subTest(url_name, **params):
+                slow, _ = self.get(url_name, params, fast=False)
+                fast, used_fast_path = self.get(url_name, params, fast=True)
+                self.assertTrue(used_fast_path)
+                self.assertEqual(fast.content, slow.content)
+
+    def test_cursor_continues_from_rows(self):
+        params = {"ordering": "-available_pax", "page_size": 4}
+        pages = {}
+        for fast in (False, True):
+            response, _ = self.get("trip-list", params, fast)
+            ids = []
+            while True:
+                ids += [row["id"] for row in response.data["results"]]
+                if not response.data["next"]:
+                    break
+                with override_settings(FAST_LIST_SERIALIZATION=fast):
+                    response = self.client.get(response.data["next"])
+            pages[fast] = ids
+        self.assertEqual(pages[True], pages[False])
+        self.assertEqual(len(pages[True]), 9)
+
+    def test_method_fields_fall_back_to_the_serializer(self):
+        _, used_fast_path = self.get("booking-list", {}, fast=True)
+        self.assertFalse(used_fast_path)
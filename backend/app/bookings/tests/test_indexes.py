@@ -0,0 +1,69 @@
+import re
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+
+from ..models import Booking, Message, Trip
+from ..threads import path_segment
+from ..views import BookingViewSet, TripViewSet
+
+# A line of SQLite's query plan reading a whole table without any index.
+FULL_SCAN = re.compile(r"\bSCAN (?!.*\bUSING\b)")
+
+
+@skipUnless(connection.vendor == "sqlite", "Query plans are asserted in SQLite's EXPLAIN QUERY PLAN format.")
+class HotQueryPlanTest(TestCase):
+    """
+    Fails when one of the queries made by the viewsets, the admin or the capacity
+    counter stops being answered from an index.
+    """
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertIsNone(FULL_SCAN.search(plan), f"Full table scan in:\n{plan}")
+        return plan
+
+    def test_booking_list(self):
+        self.assertUsesIndex(BookingViewSet.queryset[:20])
+
+    def test_bookings_of_a_trip(self):
+        self.assertUsesIndex(BookingViewSet.queryset.filter(trip=1))
+
+    def test_approved_pax_of_a_trip(self):
+        plan = self.assertUsesIndex(
+            Booking.objects.filter(trip=1, status="APPROVED").values("trip").annotate(total=Sum("pax"))
+        )
+        self.assertIn("COVERING INDEX booking_trip_status_idx", plan)
+
+    def test_thread_of_a_page_of_bookings(self):
+        self.assertUsesIndex(Message.objects.filter(booking__in=[1, 2, 3]))
+
+    def test_top_level_messages_of_a_booking(self):
+        plan = self.assertUsesIndex(Message.objects.filter(booking=1, parent_message=None))
+        self.assertIn("message_booking_thread_idx", plan)
+
+    def test_subtree_of_a_message(self):
+        message = Message(pk=1, booking_id=1, path=path_segment(1), depth=0)
+        plan = self.assertUsesIndex(Message.objects.subtree(message, max_depth=2))
+        self.assertIn("message_booking_path_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_replies_at_a_depth(self):
+        plan = self.assertUsesIndex(Message.objects.filter(booking=1).at_depth(2))
+        self.assertIn("message_booking_depth_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_trip_list(self):
+        self.assertUsesIndex(TripViewSet.queryset[:20])
+
+    def test_trips_of_a_product(self):
+        plan = self.assertUsesIndex(TripViewSet.queryset.filter(product=1))
+        self.assertIn("trip_product_start_date_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_trips_with_bookings(self):
+        self.assertUsesIndex(Trip.objects.with_booking_status("at_least_one"))
+
+    def test_trips_with_available_pax(self):
+        self.assertUsesIndex(Trip.objects.with_capacity().filter(annotated_available_pax__gte=2))
@@ -1,11 +1,14 @@
 from datetime import date
+from io import StringIO
 
 from companies.models import Company
 from bookings.models import Message, Booking
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.test import TestCase
 
 from ..models import Booking, Product, Trip
+from ..threads import path_segment
 
 
 YEAR_IN_FUTURE = 3000
@@ -28,6 +31,18 @@ class TripModelTest(TestCase):
             max_pax=10,
         )
 
+    def test_trip_created_with_an_explicit_pk(self):
+        trip = Trip(
+            pk=self.trip.pk + 100,
+            product=self.trip.product,
+            start_date=self.trip.start_date,
+            end_date=self.trip.end_date,
+            max_pax=5,
+        )
+        trip.save()
+
+        self.assertEqual(Trip.objects.get(pk=trip.pk).max_pax, 5)
+
     def test_trip_max_max_has_capacity(self):
         self.trip.max_pax = 0
         with self.assertRaises(ValidationError) as context:
@@ -217,3 +232,140 @@ class BookingModelTests(TestCase):
             context.exception.error_dict['trip'][0].message,
             "This trip has already ended."
         )
+
+    def test_message_cannot_reply_to_its_own_reply(self):
+        self.message1.parent_message = self.reply2
+        with self.assertRaises(ValidationError) as context:
+            self.message1.full_clean()
+
+        self.assertIn('parent_message', context.exception.error_dict)
+
+    def test_message_can_move_to_another_branch(self):
+        self.reply2.parent_message = self.message2
+        self.reply2.full_clean()
+
+    def test_reply_must_belong_to_the_same_booking(self):
+        other_booking = Booking.objects.create(trip=self.trip, pax=1)
+        reply = Message(booking=other_booking, content="Reply", sender="User2", parent_message=self.message1)
+        with self.assertRaises(ValidationError) as context:
+            reply.full_clean()
+
+        self.assertIn('parent_message', context.exception.error_dict)
+
+    def test_message_can_move_to_another_booking(self):
+        other_booking = Booking.objects.create(trip=self.trip, pax=1)
+        parent = Message.objects.create(booking=other_booking, content="Parent", sender="User1")
+        self.reply2.booking = other_booking
+        self.reply2.parent_message = parent
+        self.reply2.full_clean()
+
+    def test_moving_a_message_to_another_booking_moves_its_replies(self):
+        other_booking = Booking.objects.create(trip=self.trip, pax=1)
+        parent = Message.objects.create(booking=other_booking, content="Parent", sender="User1")
+        self.reply1.booking = other_booking
+        self.reply1.parent_message = parent
+        self.reply1.full_clean()
+        self.reply1.save()
+
+        self.assertEqual(list(Message.objects.thread(self.booking)), [self.message1, self.message2])
+        self.assertEqual(list(Message.objects.thread(other_booking)), [parent, self.reply1, self.reply2])
+        self.reply2.refresh_from_db()
+        self.assertEqual(self.reply2.depth, 2)
+        self.assertEqual(self.reply2.path, parent.path + path_segment(self.reply1.pk) + path_segment(self.reply2.pk))
+
+        # A whole thread moves with its top message.
+        parent.booking = self.booking
+        parent.save()
+        self.assertFalse(Message.objects.thread(other_booking).exists())
+        self.assertEqual(list(Message.objects.subtree(parent)), [parent, self.reply1, self.reply2])
+
+    def test_messages_get_their_thread_path_on_insert(self):
+        self.assertEqual(self.message1.depth, 0)
+        self.assertEqual(self.reply2.depth, 2)
+        self.reply2.refresh_from_db()
+        self.assertEqual(self.reply2.path, self.reply1.path + path_segment(self.reply2.pk))
+
+        self.assertEqual(
+            list(Message.objects.thread(self.booking)),
+            [self.message1, self.reply1, self.reply2, self.message2],
+        )
+        self.assertEqual(list(Message.objects.subtree(self.reply1)), [self.reply1, self.reply2])
+        self.assertEqual(list(Message.objects.subtree(self.message1, max_depth=1)), [self.message1, self.reply1])
+        self.assertEqual(list(Message.objects.filter(booking=self.booking).at_depth(1)), [self.reply1])
+
+    def test_moving_a_message_moves_its_subtree(self):
+        self.reply1.parent_message = self.message2
+        self.reply1.save()
+
+        self.assertEqual(list(Message.objects.subtree(self.message1)), [self.message1])
+        self.assertEqual(list(Message.objects.subtree(self.message2)), [self.message2, self.reply1, self.reply2])
+        self.reply2.refresh_from_db()
+        self.assertEqual(self.reply2.depth, 2)
+
+        self.reply1.parent_message = None
+        self.reply1.save()
+
+        self.reply2.refresh_from_db()
+        self.assertEqual(self.reply2.depth, 1)
+        self.assertEqual(list(Message.objects.subtree(self.reply1)), [self.reply1, self.reply2])
+
+
+class BookedPaxCounterTests(TestCase):
+    def setUp(self):
+        company = Company.objects.create(name="Test Company")
+        product = Product.objects.create(
+            name="Test Product",
+            description="Test Product Description",
+            price=100.00,
+            company=company,
+        )
+        self.trip = Trip.objects.create(
+            product=product,
+            start_date=date(YEAR_IN_FUTURE, 1, 1),
+            end_date=date(YEAR_IN_FUTURE, 1, 20),
+            max_pax=10,
+        )
+        self.booking = Booking.objects.create(trip=self.trip, pax=4).approve_booking()
+
+    def stored_booked_pax(self):
+        return Trip.objects.get(pk=self.trip.pk).booked_pax
+
+    def test_approving_increments_counter(self):
+        self.assertEqual(self.stored_booked_pax(), 4)
+
+    def test_rejecting_approved_booking_releases_pax(self):
+        self.booking.status = "REJECTED"
+        self.booking.save()
+        self.assertEqual(self.stored_booked_pax(), 0)
+
+    def test_changing_pax_of_approved_booking_adjusts_counter(self):
+        self.booking.pax = 6
+        self.booking.save()
+        self.assertEqual(self.stored_booked_pax(), 6)
+
+    def test_pending_booking_does_not_count(self):
+        pending = Booking.objects.create(trip=self.trip, pax=3)
+        pending.pax = 5
+        pending.save()
+        self.assertEqual(self.stored_booked_pax(), 4)
+
+    def test_deleting_approved_booking_releases_pax(self):
+        self.booking.delete()
+        self.assertEqual(self.stored_booked_pax(), 0)
+
+    def test_queryset_delete_releases_pax(self):
+        Booking.objects.create(trip=self.trip, pax=2).approve_booking()
+        Booking.objects.filter(trip=self.trip).delete()
+        self.assertEqual(self.stored_booked_pax(), 0)
+
+    def test_saving_stale_trip_does_not_overwrite_counter(self):
+        stale_trip = Trip.objects.get(pk=self.trip.pk)
+        Booking.objects.create(trip=self.trip, pax=3).approve_booking()
+        stale_trip.max_pax = 12
+        stale_trip.save()
+        self.assertEqual(self.stored_booked_pax(), 7)
+
+    def test_rebuild_booked_pax_command(self):
+        Trip.objects.update(booked_pax=0)
+        call_command("rebuild_booked_pax", stdout=StringIO())
+        self.assertEqual(self.stored_booked_pax(), 4)
@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from app.query_budget import QueryBudgetExceeded, fingerprint, record_queries
+from companies.models import Company
+
+from ..models import Product, Trip
+from ..views import ProductViewSet
+
+
+class QueryBudgetMiddlewareTest(APITestCase):
+    def setUp(self):
+        for i in range(3):
+            company = Company.objects.create(name=f"Company {i}")
+            Product.objects.create(name="Product", description="Description", price=100.00, company=company)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("product-list"))
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="1 queries, 0 duplicated"$')
+
+    # The N+1 below comes from the serializer, the fast list path would join it away.
+    @override_settings(QUERY_BUDGET_STRICT=True, FAST_LIST_SERIALIZATION=False)
+    def test_exceeding_the_budget_fails_in_strict_mode(self):
+        with mock.patch.object(ProductViewSet, "queryset", Product.objects.all()):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse("product-list"))
+
+    @override_settings(FAST_LIST_SERIALIZATION=False)
+    def test_exceeding_the_budget_is_logged(self):
+        with mock.patch.object(ProductViewSet, "queryset", Product.objects.all()):
+            with self.assertLogs("app.query_budget", "WARNING") as logs:
+                response = self.client.get(reverse("product-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="4 queries, 3 duplicated"', response["Server-Timing"])
+        self.assertTrue(any("its budget is 2" in line for line in logs.output))
+        self.assertTrue(any("repeated a query 3 times" in line for line in logs.output))
+
+
+class FingerprintTest(APITestCase):
+    def test_queries_differing_in_parameters_share_a_fingerprint(self):
+        with record_queries() as recorder:
+            list(Trip.objects.filter(pk__in=[1, 2, 3]))
+            list(Trip.objects.filter(pk__in=[4]))
+            list(Trip.objects.filter(max_pax=1))
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(list(recorder.duplicates.values()), [2])
+        self.assertEqual(
+            fingerprint("SELECT 1 WHERE a = 'x' AND b IN (%s, %s)"), "SELECT ? WHERE a = ? AND b IN (...)"
+        )
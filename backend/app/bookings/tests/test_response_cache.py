@@ -0,0 +1,105 @@
+from datetime import date
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from app.response_cache import CACHE_HEADER, get_cache, get_versions, invalidate_models, metrics, version_key
+from companies.models import Company
+
+from ..models import Booking, Product, Trip
+
+
+YEAR_IN_FUTURE = 3000
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class CachedResponseTest(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        metrics.reset()
+        self.company = Company.objects.create(name="Test Company")
+        self.product = Product.objects.create(
+            name="Test Product",
+            description="Test Product Description",
+            price=100.00,
+            company=self.company,
+        )
+        self.trip = Trip.objects.create(
+            product=self.product,
+            start_date=date(YEAR_IN_FUTURE, 1, 1),
+            end_date=date(YEAR_IN_FUTURE, 1, 20),
+            max_pax=10,
+        )
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        url = reverse("product-list")
+        response = self.client.get(url)
+        self.assertEqual(response[CACHE_HEADER], "miss")
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertEqual(cached[CACHE_HEADER], "hit")
+        self.assertEqual(cached.content, response.content)
+
+        self.assertEqual(self.client.get(url, {"fields": "id"})[CACHE_HEADER], "miss")
+        self.assertEqual(self.client.get(url, {"fields": "id"})[CACHE_HEADER], "hit")
+
+    def test_writes_invalidate_dependent_views(self):
+        url = reverse("product-detail", args=[self.product.id])
+        self.client.get(url)
+
+        self.company.name = "Renamed"
+        self.company.save()
+        response = self.client.get(url)
+        self.assertEqual(response[CACHE_HEADER], "miss")
+        self.assertEqual(response.data["company_name"], "Renamed")
+
+    def test_booking_changes_invalidate_trip_capacity(self):
+        trip_url = reverse("trip-detail", args=[self.trip.id])
+        company_url = reverse("company-detail", args=[self.company.id])
+        self.client.get(trip_url)
+        self.client.get(company_url)
+
+        booking = Booking.objects.create(trip=self.trip, pax=4)
+        booking.approve_booking()
+
+        response = self.client.get(trip_url)
+        self.assertEqual(response[CACHE_HEADER], "miss")
+        self.assertEqual(response.data["available_pax"], 6)
+        self.assertEqual(self.client.get(company_url).data["total_bookings"], 1)
+
+        booking.delete()
+        self.assertEqual(self.client.get(trip_url).data["available_pax"], 10)
+
+    def test_metrics(self):
+        url = reverse("trip-list")
+        for _ in range(3):
+            self.client.get(url)
+
+        response = self.client.get(reverse("response-cache-metrics"))
+        self.assertEqual(response.data, {"trip-list": {"hits": 2, "misses": 1}})
+
+    @override_settings(RESPONSE_CACHE=False)
+    def test_disabled(self):
+        self.client.get(reverse("trip-list"))
+        response = self.client.get(reverse("trip-list"))
+        self.assertNotIn(CACHE_HEADER, response)
+
+
+class VersionTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_invalidation_is_repeated_on_commit(self):
+        [before] = get_versions([Trip])
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_models(Trip)
+            self.assertEqual(get_versions([Trip]), [before + 1])
+        self.assertEqual(get_versions([Trip]), [before + 2])
+
+    def test_evicted_versions_never_go_back(self):
+        [before] = get_versions([Trip])
+        get_cache().delete(version_key(Trip))
+        [after] = get_versions([Trip])
+        self.assertGreater(after, before)
@@ -0,0 +1,70 @@
+from datetime import date
+
+from django.test import TestCase
+
+from companies.models import Company
+
+from ..models import Booking, Product, Trip
+from ..serializers import BookingSerializer, TripSerializer
+
+YEAR_IN_FUTURE = 3000
+
+
+class BulkValidationTest(TestCase):
+    def setUp(self):
+        company = Company.objects.create(name="Test Company")
+        self.product = Product.objects.create(
+            name="Test Product",
+            description="Test Product Description",
+            price=100.00,
+            company=company,
+        )
+        self.trips = [
+            Trip.objects.create(
+                product=self.product,
+                start_date=date(YEAR_IN_FUTURE, 1, day),
+                end_date=date(YEAR_IN_FUTURE, 1, 20),
+                max_pax=10,
+            )
+            for day in range(1, 4)
+        ]
+
+    def test_related_objects_are_loaded_in_one_query(self):
+        data = [{"trip": trip.id, "pax": pax} for trip in self.trips for pax in (1, 2)]
+        serializer = BookingSerializer(data=data, many=True)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        serializer.save()
+        self.assertEqual(Booking.objects.count(), 6)
+
+    def test_errors_are_reported_per_item(self):
+        ended = self.trips[0]
+        Trip.objects.filter(pk=ended.pk).update(start_date=date(2020, 1, 1), end_date=date(2020, 1, 2))
+        data = [
+            {"trip": self.trips[1].id, "pax": 1},
+            {"trip": 999, "pax": 1},
+            {"trip": ended.id, "pax": 1},
+            {"trip": self.trips[2].id, "pax": 1, "status": "APPROVED"},
+        ]
+        serializer = BookingSerializer(data=data, many=True)
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors[0], {})
+        self.assertIn("trip", serializer.errors[1])
+        self.assertIn("trip", serializer.errors[2])
+        self.assertIn("status", serializer.errors[3])
+
+    def test_trips_are_validated_in_bulk(self):
+        data = [
+            {"product": self.product.id, "start_date": date(YEAR_IN_FUTURE, 2, start_day),
+             "end_date": date(YEAR_IN_FUTURE, 2, 5), "max_pax": 5}
+            for start_day in (1, 9)
+        ]
+        serializer = TripSerializer(data=data, many=True)
+
+        with self.assertNumQueries(1):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors[0], {})
+        self.assertIn("start_date", serializer.errors[1])
@@ -0,0 +1,125 @@
+import threading
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+
+from companies.models import Company
+
+from ..models import Booking, Product, Trip
+from ..services import approve_bookings
+
+
+YEAR_IN_FUTURE = 3000
+
+
+def create_trip(max_pax):
+    company = Company.objects.create(name="Test Company")
+    product = Product.objects.create(
+        name="Test Product",
+        description="Test Product Description",
+        price=100.00,
+        company=company,
+    )
+    return Trip.objects.create(
+        product=product,
+        start_date=date(YEAR_IN_FUTURE, 1, 1),
+        end_date=date(YEAR_IN_FUTURE, 1, 20),
+        max_pax=max_pax,
+    )
+
+
+class ApproveBookingsTest(TestCase):
+    def setUp(self):
+        self.trip = create_trip(max_pax=10)
+
+    def test_approves_batch_for_same_trip(self):
+        bookings = [Booking.objects.create(trip=self.trip, pax=pax) for pax in (3, 4)]
+        approve_bookings(bookings)
+
+        self.assertEqual(Trip.objects.get(pk=self.trip.pk).booked_pax, 7)
+        self.assertEqual(
+            set(Booking.objects.filter(trip=self.trip).values_list("status", flat=True)), {"APPROVED"}
+        )
+        self.assertEqual(self.trip.booked_pax, 7)
+
+    def test_batch_exceeding_capacity_approves_nothing(self):
+        bookings = [Booking.objects.create(trip=self.trip, pax=pax) for pax in (6, 5)]
+        with self.assertRaises(ValidationError) as context:
+            approve_bookings(bookings)
+
+        self.assertIn("pax", context.exception.error_dict)
+        self.assertEqual(Trip.objects.get(pk=self.trip.pk).booked_pax, 0)
+        self.assertFalse(Booking.objects.filter(status="APPROVED").exists())
+
+    def test_stale_capacity_is_rejected_by_the_database(self):
+        booking = Booking.objects.create(trip=self.trip, pax=6)
+        Booking.objects.create(trip=Trip.objects.get(pk=self.trip.pk), pax=5).approve_booking()
+
+        # self.trip still believes the trip is empty.
+        with self.assertRaises(ValidationError) as context:
+            approve_bookings([booking])
+
+        self.assertIn("pax", context.exception.error_dict)
+        self.assertEqual(Trip.objects.get(pk=self.trip.pk).booked_pax, 5)
+
+    def test_bookings_from_different_trips_are_rejected(self):
+        other_trip = create_trip(max_pax=10)
+        bookings = [
+            Booking.objects.create(trip=self.trip, pax=1),
+            Booking.objects.create(trip=other_trip, pax=1),
+        ]
+        with self.assertRaises(ValidationError) as context:
+            approve_bookings(bookings)
+        self.assertIn("trip", context.exception.error_dict)
+
+
+class ConcurrentApprovalTest(TransactionTestCase):
+    THREADS = 8
+    ROUNDS = 5
+
+    def test_concurrent_approvals_never_overbook(self):
+        trip = create_trip(max_pax=10)
+        booking_ids = [
+            Booking.objects.create(trip=trip, pax=3).pk
+            for _ in range(self.THREADS * self.ROUNDS)
+        ]
+        barrier = threading.Barrier(self.THREADS, timeout=10)
+        errors = []
+
+        def approve(ids):
+            try:
+                for booking_id in ids:
+                    barrier.wait()
+                    while True:
+                        try:
+                            booking = Booking.objects.select_related("trip").get(pk=booking_id)
+                            approve_bookings([booking])
+                        except ValidationError:
+                            pass  # The trip is full.
+                        except OperationalError:
+                            continue  # SQLite allows a single writer, retry like a client would.
+                        break
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=approve, args=(booking_ids[i::self.THREADS],))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        trip.refresh_from_db()
+        approved_pax = sum(
+            Booking.objects.filter(trip=trip, status="APPROVED").values_list("pax", flat=True)
+        )
+        self.assertLessEqual(approved_pax, trip.max_pax)
+        self.assertEqual(trip.booked_pax, approved_pax)
+        self.assertEqual(approved_pax, 9)
@@ -0,0 +1,45 @@
+from django.test import SimpleTestCase
+
+from ..threads import ThreadLinker, path_range, path_segment
+
+
+class ThreadLinkerTest(SimpleTestCase):
+    def test_linking_under_a_descendant_is_a_cycle(self):
+        linker = ThreadLinker([(1, None), (2, 1), (3, 2), (4, None)])
+
+        self.assertTrue(linker.would_create_cycle(1, 3))
+        self.assertTrue(linker.would_create_cycle(1, 1))
+        self.assertFalse(linker.would_create_cycle(4, 3))
+        with self.assertRaises(ValueError):
+            linker.link(1, 3)
+
+    def test_moving_a_reply_splits_its_subtree_off(self):
+        linker = ThreadLinker([(1, None), (2, 1), (3, 2)])
+
+        linker.link(2, None)
+
+        self.assertFalse(linker.would_create_cycle(1, 3))
+        self.assertTrue(linker.would_create_cycle(2, 3))
+        linker.link(3, 1)
+        self.assertEqual(linker.parents, {1: None, 2: None, 3: 1})
+
+    def test_deep_chains_do_not_recurse(self):
+        depth = 20_000
+        linker = ThreadLinker([(0, None)] + [(key, key - 1) for key in range(1, depth)])
+
+        self.assertTrue(linker.would_create_cycle(0, depth - 1))
+        self.assertTrue(linker.would_create_cycle(1, depth - 1))
+        self.assertFalse(linker.would_create_cycle(depth - 1, 0))
+
+
+class PathRangeTest(SimpleTestCase):
+    def test_subtree_range_holds_only_the_subtree(self):
+        root = path_segment(1) + path_segment(9)
+        lower, upper = path_range(root)
+
+        self.assertTrue(root.isdigit())
+        self.assertEqual(upper, path_segment(1) + path_segment(10))
+        for path in (root, root + path_segment(2), root + path_segment(99) + path_segment(3)):
+            self.assertTrue(lower <= path < upper, path)
+        for path in (path_segment(1), path_segment(1) + path_segment(8), upper, path_segment(2)):
+            self.assertFalse(lower <= path < upper, path)
@@ -0,0 +1,452 @@
+import json
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from companies.models import Company
+
+from ..models import Booking, Message, Product, Trip
+
+
+YEAR_IN_FUTURE = 3000
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class BookingViewSetTest(APITestCase):
+    def setUp(self):
+        company = Company.objects.create(name="Test Company")
+        product = Product.objects.create(
+            name="Test Product",
+            description="Test Product Description",
+            price=100.00,
+            company=company,
+        )
+        self.trip = Trip.objects.create(
+            product=product,
+            start_date=date(YEAR_IN_FUTURE, 1, 1),
+            end_date=date(YEAR_IN_FUTURE, 1, 20),
+            max_pax=10,
+        )
+        self.booking = Booking.objects.create(trip=self.trip, pax=2)
+
+    def create_reply_chain(self, booking, depth):
+        parent = None
+        for i in range(depth):
+            parent = Message.objects.create(
+                booking=booking, content=f"Message {i}", sender="user", parent_message=parent
+            )
+
+    def test_email_thread_is_nested_by_replies(self):
+        message1 = Message.objects.create(booking=self.booking, content="Parent 1", sender="User1")
+        reply1 = Message.objects.create(
+            booking=self.booking, content="Reply 1", sender="User2", parent_message=message1
+        )
+        Message.objects.create(booking=self.booking, content="Reply 2", sender="User3", parent_message=reply1)
+        Message.objects.create(booking=self.booking, content="Parent 2", sender="User1")
+
+        response = self.client.get(reverse("booking-detail", args=[self.booking.id]))
+
+        self.assertEqual(response.status_code, 200)
+        thread = response.data["email_thread"]
+        self.assertEqual([message["content"] for message in thread], ["Parent 1", "Parent 2"])
+        self.assertEqual(thread[0]["replies"][0]["content"], "Reply 1")
+        self.assertEqual(thread[0]["replies"][0]["replies"][0]["content"], "Reply 2")
+        self.assertEqual(thread[0]["replies"][0]["replies"][0]["replies"], [])
+        self.assertEqual(thread[1]["replies"], [])
+
+    def test_list_query_count_does_not_depend_on_thread_depth(self):
+        self.create_reply_chain(self.booking, depth=2)
+        with self.assertNumQueries(2) as shallow:
+            self.client.get(reverse("booking-list"))
+
+        deep_booking = Booking.objects.create(trip=self.trip, pax=1)
+        self.create_reply_chain(deep_booking, depth=30)
+        with self.assertNumQueries(len(shallow.captured_queries)):
+            response = self.client.get(reverse("booking-list"))
+
+        thread = response.data["results"][1]["email_thread"]
+        depth = 0
+        while thread:
+            depth += 1
+            thread = thread[0]["replies"]
+        self.assertEqual(depth, 30)
+
+    def test_thread_summary_replaces_email_thread(self):
+        self.create_reply_chain(self.booking, depth=3)
+        Message.objects.create(booking=self.booking, content="Another", sender="user")
+        empty_booking = Booking.objects.create(trip=self.trip, pax=1)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("booking-list"), {"thread": "summary"})
+
+        summary, empty_summary = response.data["results"]
+        self.assertNotIn("email_thread", summary)
+        self.assertEqual(summary["message_count"], 4)
+        self.assertEqual(summary["thread_depth"], 3)
+        latest = Message.objects.filter(booking=self.booking).latest("timestamp")
+        self.assertEqual(summary["last_message_at"], latest.timestamp.isoformat().replace("+00:00", "Z"))
+        self.assertEqual(empty_summary["id"], empty_booking.id)
+        self.assertEqual((empty_summary["message_count"], empty_summary["last_message_at"]), (0, None))
+        self.assertEqual(empty_summary["thread_depth"], 0)
+
+        response = self.client.get(reverse("booking-detail", args=[self.booking.id]), {"thread": "summary"})
+        self.assertEqual(response.data["message_count"], 4)
+
+    def test_unknown_thread_mode_is_rejected(self):
+        response = self.client.get(reverse("booking-list"), {"thread": "nested"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_approving_through_update_checks_capacity(self):
+        trip = Trip.objects.create(
+            product=self.trip.product,
+            start_date=date(YEAR_IN_FUTURE, 2, 1),
+            end_date=date(YEAR_IN_FUTURE, 2, 20),
+            max_pax=2,
+        )
+        booking = Booking.objects.create(trip=trip, pax=5)
+        url = reverse("booking-detail", args=[booking.id])
+
+        response = self.client.patch(url, {"status": "APPROVED"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("pax", response.data)
+        response = self.client.put(url, {"trip": trip.id, "pax": 5, "status": "APPROVED"})
+        self.assertEqual(response.status_code, 400)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, "PENDING")
+        self.assertEqual(Trip.objects.get(pk=trip.pk).booked_pax, 0)
+
+        response = self.client.put(url, {"trip": trip.id, "pax": 2, "status": "APPROVED"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "APPROVED")
+        self.assertEqual(Trip.objects.get(pk=trip.pk).booked_pax, 2)
+
+        response = self.client.patch(url, {"status": "APPROVED"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Trip.objects.get(pk=trip.pk).booked_pax, 2)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class MessageViewSetTest(APITestCase):
+    def setUp(self):
+        company = Company.objects.create(name="Test Company")
+        product = Product.objects.create(
+            name="Test Product",
+            description="Test Product Description",
+            price=100.00,
+            company=company,
+        )
+        trip = Trip.objects.create(
+            product=product,
+            start_date=date(YEAR_IN_FUTURE, 1, 1),
+            end_date=date(YEAR_IN_FUTURE, 1, 20),
+            max_pax=10,
+        )
+        booking = Booking.objects.create(trip=trip, pax=2)
+        self.root = Message.objects.create(booking=booking, content="Root", sender="user")
+        self.other_root = Message.objects.create(booking=booking, content="Other root", sender="user")
+        parent = self.root
+        for i in range(5):
+            parent = Message.objects.create(booking=booking, content=f"Reply {i}", sender="admin", parent_message=parent)
+        Message.objects.create(booking=booking, content="Sibling", sender="user", parent_message=self.root)
+
+    def get_subtree(self, message, **params):
+        response = self.client.get(reverse("message-detail", args=[message.id]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def contents(self, data):
+        contents, stack = [], [data]
+        while stack:
+            message = stack.pop()
+            contents.append(message["content"])
+            stack.extend(reversed(message["replies"]))
+        return contents
+
+    def test_returns_the_whole_subtree_in_two_queries(self):
+        with self.assertNumQueries(2):
+            data = self.get_subtree(self.root)
+
+        self.assertEqual(self.contents(data), ["Root"] + [f"Reply {i}" for i in range(5)] + ["Sibling"])
+        self.assertFalse(data["truncated"])
+        self.assertEqual(self.contents(self.get_subtree(self.other_root)), ["Other root"])
+
+    def test_max_depth_and_limit_truncate_the_subtree(self):
+        data = self.get_subtree(self.root, max_depth=1)
+        self.assertEqual(self.contents(data), ["Root", "Reply 0", "Sibling"])
+        self.assertFalse(data["truncated"])
+
+        data = self.get_subtree(self.root, limit=3)
+        self.assertEqual(self.contents(data), ["Root", "Reply 0", "Reply 1"])
+        self.assertTrue(data["truncated"])
+
+    def test_invalid_parameters_are_rejected(self):
+        response = self.client.get(reverse("message-detail", args=[self.root.id]), {"limit": 0})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("limit", response.data)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class TripViewSetTest(APITestCase):
+    def setUp(self):
+        company = Company.objects.create(name="Test Company")
+        self.product = Product.objects.create(
+            name="Test Product",
+            description="Test Product Description",
+            price=100.00,
+            company=company,
+        )
+
+    def create_trip(self, max_pax=10, day=1):
+        return Trip.objects.create(
+            product=self.product,
+            start_date=date(YEAR_IN_FUTURE, 1, day),
+            end_date=date(YEAR_IN_FUTURE, 1, 20),
+            max_pax=max_pax,
+        )
+
+    def test_list_reads_capacity_from_a_single_query(self):
+        for day in range(1, 21):
+            trip = self.create_trip(max_pax=day)
+            Booking.objects.create(trip=trip, pax=min(day, 5)).approve_booking()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("trip-list"))
+
+        for row in response.data["results"]:
+            trip = Trip.objects.get(pk=row["id"])
+            self.assertEqual(row["booked_pax"], trip.booked_pax)
+            self.assertEqual(row["available_pax"], trip.available_pax)
+            self.assertEqual(row["has_space"], trip.has_space)
+            self.assertEqual(row["is_full"], trip.is_full)
+
+    def test_update_returns_current_capacity(self):
+        trip = self.create_trip(max_pax=4)
+        Booking.objects.create(trip=trip, pax=4).approve_booking()
+
+        response = self.client.put(reverse("trip-detail", args=[trip.id]), {
+            "product": self.product.id,
+            "start_date": trip.start_date,
+            "end_date": trip.end_date,
+            "max_pax": 6,
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["available_pax"], 2)
+        self.assertTrue(response.data["has_space"])
+        self.assertFalse(response.data["is_full"])
+
+    def test_update_validates_once(self):
+        trip = self.create_trip()
+        data = {"product": self.product.id, "start_date": trip.start_date, "end_date": trip.end_date, "max_pax": 6}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(reverse("trip-detail", args=[trip.id]), data)
+
+        self.assertEqual(response.status_code, 200)
+        product_queries = [q["sql"] for q in queries.captured_queries if '"bookings_product"' in q["sql"]]
+        self.assertEqual(len(product_queries), 1)
+
+    def test_partial_update_validates_the_whole_trip(self):
+        trip = self.create_trip()
+
+        response = self.client.patch(reverse("trip-detail", args=[trip.id]), {"max_pax": 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["max_pax"], 4)
+
+        response = self.client.patch(reverse("trip-detail", args=[trip.id]), {"end_date": date(YEAR_IN_FUTURE - 1, 1, 1)})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("end_date", response.data)
+
+    def test_filter_by_booking_status_and_available_pax(self):
+        empty = self.create_trip(max_pax=10, day=1)
+        partial = self.create_trip(max_pax=10, day=2)
+        full = self.create_trip(max_pax=4, day=3)
+        Booking.objects.create(trip=partial, pax=3).approve_booking()
+        Booking.objects.create(trip=full, pax=4).approve_booking()
+
+        def ids(params):
+            response = self.client.get(reverse("trip-list"), params)
+            return [row["id"] for row in response.data["results"]]
+
+        self.assertEqual(ids({"booking_status": "no_bookings"}), [empty.id])
+        self.assertEqual(ids({"booking_status": "partially_booked"}), [partial.id])
+        self.assertEqual(ids({"booking_status": "fully_booked"}), [full.id])
+        self.assertEqual(ids({"booking_status": "at_least_one"}), [partial.id, full.id])
+        self.assertEqual(ids({"min_available_pax": 8}), [empty.id])
+        self.assertEqual(ids({"start_date_after": date(YEAR_IN_FUTURE, 1, 2)}), [partial.id, full.id])
+        self.assertEqual(
+            ids({"company": self.product.company_id, "start_date_before": date(YEAR_IN_FUTURE, 1, 1)}),
+            [empty.id],
+        )
+
+    def test_order_by_capacity(self):
+        small = self.create_trip(max_pax=2, day=1)
+        large = self.create_trip(max_pax=10, day=2)
+        Booking.objects.create(trip=large, pax=5).approve_booking()
+
+        response = self.client.get(reverse("trip-list"), {"ordering": "-available_pax"})
+        self.assertEqual([row["id"] for row in response.data["results"]], [large.id, small.id])
+
+        response = self.client.get(reverse("trip-list"), {"ordering": "booked_pax"})
+        self.assertEqual([row["id"] for row in response.data["results"]], [small.id, large.id])
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class CursorPaginationTest(APITestCase):
+    def setUp(self):
+        company = Company.objects.create(name="Test Company")
+        product = Product.objects.create(
+            name="Test Product",
+            description="Test Product Description",
+            price=100.00,
+            company=company,
+        )
+        self.trip = Trip.objects.create(
+            product=product,
+            start_date=date(YEAR_IN_FUTURE, 1, 1),
+            end_date=date(YEAR_IN_FUTURE, 1, 20),
+            max_pax=100,
+        )
+        Booking.objects.bulk_create([Booking(trip=self.trip, pax=1) for _ in range(45)])
+        # Rows sharing a created_at must still page in a stable (created_at, id) order.
+        Booking.objects.update(created_at=timezone.now())
+        self.booking_ids = list(Booking.objects.order_by("id").values_list("id", flat=True))
+
+    def test_pages_forwards_and_backwards_without_counting(self):
+        seen = []
+        url = reverse("booking-list")
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertNotIn("count", response.data)
+        while True:
+            seen.extend(row["id"] for row in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(seen, self.booking_ids)
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual([row["id"] for row in response.data["results"]], self.booking_ids[20:40])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse("booking-list"), {"cursor": "cD1nYXJiYWdl"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_pagination_is_opt_in(self):
+        response = self.client.get(reverse("booking-list"), {"page": 3})
+        self.assertEqual(response.data["count"], 45)
+        self.assertEqual([row["id"] for row in response.data["results"]], self.booking_ids[40:])
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class BookingExportTest(APITestCase):
+    def setUp(self):
+        self.trips = []
+        for name in ("First Company", "Second Company"):
+            company = Company.objects.create(name=name)
+            product = Product.objects.create(
+                name="Test Product",
+                description="Test Product Description",
+                price=100.00,
+                company=company,
+            )
+            self.trips.append(Trip.objects.create(
+                product=product,
+                start_date=date(YEAR_IN_FUTURE, 1, 1),
+                end_date=date(YEAR_IN_FUTURE, 1, 20),
+                max_pax=10,
+            ))
+        self.booking = Booking.objects.create(trip=self.trips[0], pax=2)
+        self.other_booking = Booking.objects.create(trip=self.trips[1], pax=3)
+        message = Message.objects.create(booking=self.booking, content="Question", sender="user")
+        Message.objects.create(booking=self.booking, content="Answer", sender="admin", parent_message=message)
+
+    def export(self, **params):
+        response = self.client.get(reverse("booking-export"), params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_includes_threads(self):
+        lines = [json.loads(line) for line in self.export().splitlines()]
+
+        self.assertEqual([line["id"] for line in lines], [self.booking.id, self.other_booking.id])
+        detail = self.client.get(reverse("booking-detail", args=[self.booking.id])).json()
+        self.assertEqual(lines[0], detail)
+        self.assertEqual(lines[0]["email_thread"][0]["replies"][0]["content"], "Answer")
+
+    def test_csv_leaves_threads_out(self):
+        lines = self.export(export_format="csv").splitlines()
+
+        self.assertEqual(lines[0], "id,trip,pax,status,created_at,updated_at")
+        self.assertTrue(lines[1].startswith(f"{self.booking.id},{self.trips[0].id},2,PENDING,"))
+        self.assertEqual(len(lines), 3)
+
+    def test_filters(self):
+        company_id = self.trips[1].product.company_id
+        self.assertEqual(len(self.export(company=company_id).splitlines()), 1)
+        self.assertEqual(len(self.export(trip=self.trips[0].id).splitlines()), 1)
+        tomorrow = date.today() + timedelta(days=1)
+        self.assertEqual(self.export(created_after=tomorrow), "")
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse("booking-export"), {"export_format": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class SparseFieldsetTest(APITestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Test Company", description="Description")
+        product = Product.objects.create(
+            name="Test Product",
+            description="Test Product Description",
+            price=100.00,
+            company=self.company,
+        )
+        trip = Trip.objects.create(
+            product=product,
+            start_date=date(YEAR_IN_FUTURE, 1, 1),
+            end_date=date(YEAR_IN_FUTURE, 1, 20),
+            max_pax=10,
+        )
+        self.booking = Booking.objects.create(trip=trip, pax=2)
+        Message.objects.create(booking=self.booking, content="Question", sender="user")
+
+    def test_fields_skip_the_thread_prefetch_and_unused_columns(self):
+        with self.assertNumQueries(1) as queries:
+            response = self.client.get(reverse("booking-list"), {"fields": "id,status"})
+
+        self.assertEqual(response.data["results"], [{"id": self.booking.id, "status": "PENDING"}])
+        self.assertNotIn('"pax"', queries.captured_queries[0]["sql"])
+
+    def test_omit_leaves_fields_out(self):
+        response = self.client.get(reverse("booking-detail", args=[self.booking.id]), {"omit": "email_thread,pax"})
+        self.assertNotIn("email_thread", response.data)
+        self.assertNotIn("pax", response.data)
+        self.assertEqual(response.data["trip"], self.booking.trip_id)
+
+        response = self.client.get(reverse("booking-list"), {"thread": "summary", "fields": "id,message_count"})
+        self.assertEqual(response.data["results"], [{"id": self.booking.id, "message_count": 1}])
+
+    def test_related_fields_are_joined_only_when_requested(self):
+        with self.assertNumQueries(1) as queries:
+            response = self.client.get(reverse("product-list"), {"fields": "name"})
+        self.assertEqual(response.data["results"], [{"name": "Test Product"}])
+        self.assertNotIn("companies_company", queries.captured_queries[0]["sql"])
+
+        response = self.client.get(reverse("product-list"), {"fields": "name,company_name"})
+        self.assertEqual(response.data["results"], [{"name": "Test Product", "company_name": "Test Company"}])
+
+    def test_companies(self):
+        response = self.client.get(reverse("company-detail", args=[self.company.id]), {"omit": "description"})
+        self.assertEqual(response.data, {"id": self.company.id, "name": "Test Company", "total_bookings": 1})
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse("booking-list"), {"fields": "id,secret"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("secret", response.data["fields"])
@@ -0,0 +1,152 @@
+from collections.abc import Callable, Hashable, Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .models import Message
+
+# Message.path is the zero-padded id of each ancestor and of the message itself.
+# Paths then sort in thread order, and a subtree is the range of paths starting
+# with its root's. They are made of digits only, so they sort the same under any
+# collation, not just byte order: PostgreSQL's default collations skip
+# punctuation such as a separator when comparing.
+PATH_SEGMENT_WIDTH = 10
+
+
+def build_thread(messages: Iterable["Message"]) -> list["Message"]:
+    """
+    Links each message to its replies in memory using ``parent_message_id`` and
+    returns the top-level messages. Replies are stored on ``thread_replies`` in
+    the order the messages were given, so no further queries are needed to walk
+    the thread.
+    """
+    messages = list(messages)
+    messages_by_id = {message.id: message for message in messages}
+    roots = []
+    for message in messages:
+        message.thread_replies = []
+    for message in messages:
+        parent = messages_by_id.get(message.parent_message_id)
+        if parent is None:
+            roots.append(message)
+        else:
+            parent.thread_replies.append(message)
+    return roots
+
+
+def path_segment(pk: int) -> str:
+    return f"{pk:0{PATH_SEGMENT_WIDTH}d}"
+
+
+def path_range(path: str) -> tuple[str, str]:
+    """
+    Returns the bounds of the paths in the subtree rooted at ``path``, as a
+    half-open range. Incrementing the last segment gives the first path of the
+    root's next sibling, which sorts past the whole subtree.
+    """
+    parent, last = path[:-PATH_SEGMENT_WIDTH], int(path[-PATH_SEGMENT_WIDTH:])
+    return path, parent + path_segment(last + 1)
+
+
+def materialize_paths(messages: Iterable["Message"]):
+    """
+    Fills in ``path`` and ``depth`` for messages whose primary keys are assigned.
+    Parents may appear anywhere in ``messages``; parents outside of it must
+    already have their path. Walks up with a loop, so deep threads cannot hit the
+    recursion limit.
+    """
+    messages = list(messages)
+    messages_by_id = {message.pk: message for message in messages}
+    for message in messages:
+        chain = []
+        current = message
+        while current is not None and not current.path:
+            chain.append(current)
+            current = messages_by_id.get(current.parent_message_id) or current.parent_message
+        prefix, depth = (current.path, current.depth + 1) if current is not None else ("", 0)
+        for unresolved in reversed(chain):
+            unresolved.path = prefix = prefix + path_segment(unresolved.pk)
+            unresolved.depth = depth
+            depth += 1
+
+
+def render_thread(roots: Iterable["Message"], represent: Callable[["Message"], dict]) -> list[dict]:
+    """
+    Renders a thread built by ``build_thread`` into nested dicts with a ``replies``
+    key. Walks the tree with an explicit stack so deep threads cannot hit the
+    recursion limit.
+    """
+    rendered = []
+    stack = [(roots, rendered)]
+    while stack:
+        messages, target = stack.pop()
+        for message in messages:
+            data = represent(message)
+            data["replies"] = []
+            target.append(data)
+            stack.append((message.thread_replies, data["replies"]))
+    return rendered
+
+
+class ThreadLinker:
+    """
+    Tracks the reply links of a thread in a parent array keyed by message (an id,
+    or a position while generating data), plus a union-find of the trees they form.
+
+    Linking a top-level message under another message is the common case, when
+    building a thread or generating one, and its cycle check is a union-find lookup
+    costing O(α(n)). Moving a message that already has a parent falls back to an
+    iterative walk up the new parent's ancestors, so deep threads never recurse.
+    """
+    def __init__(self, links: Iterable[tuple[Hashable, Hashable | None]] = ()):
+        links = list(links)
+        self.parents = {}
+        self._roots = {}
+        for key, _ in links:
+            self.add(key)
+        for key, parent in links:
+            if parent is not None:
+                self.link(key, parent)
+
+    def add(self, key: Hashable):
+        self.parents[key] = None
+        self._roots[key] = key
+
+    def find(self, key: Hashable) -> Hashable:
+        """Returns a representative of the tree ``key`` belongs to."""
+        root = key
+        while self._roots[root] != root:
+            root = self._roots[root]
+        while self._roots[key] != root:
+            self._roots[key], key = root, self._roots[key]
+        return root
+
+    def would_create_cycle(self, key: Hashable, parent: Hashable) -> bool:
+        if key == parent:
+            return True
+        if self.parents[key] is None:
+            # key tops its own tree, parent is a descendant only if they share it.
+            return self.find(key) == self.find(parent)
+        ancestor = parent
+        while ancestor is not None:
+            if ancestor == key:
+                return True
+            ancestor = self.parents[ancestor]
+        return False
+
+    def link(self, key: Hashable, parent: Hashable | None):
+        """Makes ``key`` a reply to ``parent``, or a top-level message when it is None."""
+        if parent is not None and self.would_create_cycle(key, parent):
+            raise ValueError(f"Replying {key} to {parent} would create a cycle.")
+        was_root = self.parents[key] is None
+        self.parents[key] = parent
+        if was_root and parent is not None:
+            self._roots[self.find(key)] = self.find(parent)
+        elif not was_root:
+            self._rebuild_roots()
+
+    def _rebuild_roots(self):
+        # Union-find cannot split a tree, recompute it after a message is moved.
+        self._roots = {key: key for key in self.parents}
+        for key, parent in self.parents.items():
+            if parent is not None:
+                self._roots[self.find(key)] = self.find(parent)
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TripViewSet, BookingViewSet, ProductViewSet
+from .views import TripViewSet, BookingViewSet, ProductViewSet, MessageViewSet
 
 router = DefaultRouter()
 router.register(r"products", ProductViewSet)
 router.register(r"trips", TripViewSet)
 router.register(r"bookings", BookingViewSet)
+router.register(r"messages", MessageViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
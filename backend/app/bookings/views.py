@@ -1,35 +1,213 @@
-from rest_framework import viewsets
+from django.db.models import Count, OuterRef, Subquery
+from django.http import StreamingHttpResponse
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Trip, Booking, Product
-from .serializers import TripSerializer, BookingSerializer, ProductSerializer
 
+from app.bulk import BulkCreateMixin
+from app.conditional import ConditionalGetMixin, make_etag
+from app.fast_list import FastListMixin
+from app.pagination import CursorOrPageNumberPagination
+from app.response_cache import CachedResponseMixin
+from app.sparse_fieldsets import SparseFieldsetMixin
+from companies.models import Company
+from .exports import iter_csv, iter_ndjson
+from .filters import AliasedOrderingFilter, BookingExportFilter, TripFilter
+from .models import CAPACITY_ANNOTATIONS, Trip, Booking, Product, Message
+from .serializers import (
+    TripSerializer,
+    BookingSerializer,
+    BookingStatusSerializer,
+    BookingSummarySerializer,
+    ProductSerializer,
+    MessageSerializer,
+    MessageSubtreeQuerySerializer,
+)
+from .threads import build_thread
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+# Messages added, deleted, edited or moved.
+SUBTREE_VALIDATORS = ("pk", "updated_at")
+
+
+class ProductViewSet(
+    CachedResponseMixin, ConditionalGetMixin, FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
+    queryset = Product.objects.select_related("company")
     serializer_class = ProductSerializer
+    cache_models = [Product, Company]
+    pagination_class = CursorOrPageNumberPagination
+    ordering = ["created_at", "id"]
+    # List budgets leave room for the COUNT(*) of ?page= pagination.
+    query_budget = {"list": 2, "retrieve": 1}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.is_field_requested("company_name"):
+            queryset = queryset.select_related(None)
+        return queryset
 
+    def get_etag_fields(self):
+        if self.is_field_requested("company_name"):
+            return ["updated_at", "company__updated_at"]
+        return ["updated_at"]
 
-class TripViewSet(viewsets.ModelViewSet):
-    queryset = Trip.objects.all().order_by("start_date")
+
+class TripViewSet(
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    FastListMixin,
+    SparseFieldsetMixin,
+    BulkCreateMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Trip.objects.with_capacity().order_by("start_date")
     serializer_class = TripSerializer
-    filter_backends = [DjangoFilterBackend]
-    filterset_fields = ["product"]
+    # Product for the company filter. Booking writes invalidate Trip, since they
+    # move booked_pax, see signals.py.
+    cache_models = [Trip, Product]
+    # booked_pax is moved by F() updates that leave updated_at alone.
+    etag_fields = ["updated_at", "booked_pax"]
+    filter_backends = [DjangoFilterBackend, AliasedOrderingFilter]
+    filterset_class = TripFilter
+    ordering_fields = ["start_date", "booked_pax", "available_pax"]
+    ordering_aliases = {"available_pax": CAPACITY_ANNOTATIONS["available_pax"]}
+    ordering = ["start_date", "id"]
+    pagination_class = CursorOrPageNumberPagination
+    query_budget = {"list": 2, "retrieve": 1}
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(
+    ConditionalGetMixin, FastListMixin, SparseFieldsetMixin, BulkCreateMixin, viewsets.ModelViewSet
+):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
+    bulk_prefetch_related = ["messages"]
+    # The count catches deleted messages, the latest update added, edited and moved ones.
+    etag_aggregates = {
+        "messages": Subquery(
+            Message.objects.filter(booking=OuterRef("pk")).order_by()
+            .values("booking").annotate(count=Count("pk")).values("count")
+        ),
+        "messages_updated_at": Subquery(
+            Message.objects.filter(booking=OuterRef("pk")).order_by("-updated_at").values("updated_at")[:1]
+        ),
+    }
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["trip"]
+    pagination_class = CursorOrPageNumberPagination
+    ordering = ["created_at", "id"]
+    query_budget = {"list": 3, "retrieve": 2}
 
     def get_queryset(self):
-        # get the longest possible path to prefetch for this queryset.
-        # Suppose you have a message with 4 levels of reply nesting
-        # This queryset would prefetch 'messages__replies__replies__replies__replies'
         queryset = super().get_queryset()
-        prefetch_paths = []
-        current_path = "messages__replies"
-        while queryset.filter(**{f"{current_path}__isnull": False}).exists():
-            prefetch_paths.append(current_path)
-            current_path += "__replies"
-        return queryset.prefetch_related(*prefetch_paths)
+        if self.thread_mode == "summary":
+            if any(map(self.is_field_requested, ("message_count", "last_message_at", "thread_depth"))):
+                queryset = queryset.with_thread_summary()
+        elif self.is_field_requested("email_thread"):
+            # All messages for the page's bookings are fetched in a single query and
+            # threaded in memory by the serializer, so the query count does not depend
+            # on how deep the reply chains go.
+            queryset = queryset.prefetch_related("messages")
+        return queryset
+
+    def get_serializer_class(self):
+        if self.thread_mode == "summary":
+            return BookingSummarySerializer
+        return super().get_serializer_class()
+
+    @property
+    def thread_mode(self):
+        """
+        ``thread=summary`` replaces email_thread with message_count, last_message_at
+        and thread_depth on reads; ``thread=full``, the default, embeds the thread.
+        """
+        if self.request is None or self.request.method != "GET":
+            return "full"
+        thread_mode = self.request.query_params.get("thread", "full")
+        if thread_mode not in ("full", "summary"):
+            raise ValidationError({"thread": "Choose 'full' or 'summary'."})
+        return thread_mode
+
+    @action(detail=False, methods=["post"], url_path="bulk/status", serializer_class=BookingStatusSerializer)
+    def bulk_status(self, request):
+        """
+        Moves a list of bookings, ``[{"booking": 1, "status": "APPROVED"}, ...]``, to
+        new statuses together. Either every change is made, or none is and the
+        response lists the errors of each item.
+        """
+        serializer = self.get_bulk_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Streams every booking matching the trip, company and created_after /
+        created_before filters. ``export_format=ndjson`` (the default) includes each
+        email_thread, ``export_format=csv`` leaves threads out.
+        """
+        filterset = BookingExportFilter(request.query_params, queryset=Booking.objects.order_by("id"))
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        export_format = request.query_params.get("export_format", "ndjson")
+        if export_format == "ndjson":
+            response = StreamingHttpResponse(iter_ndjson(filterset.qs), content_type="application/x-ndjson")
+        elif export_format == "csv":
+            response = StreamingHttpResponse(iter_csv(filterset.qs), content_type="text/csv")
+        else:
+            raise ValidationError({"export_format": "Choose 'ndjson' or 'csv'."})
+        response["Content-Disposition"] = f'attachment; filename="bookings.{export_format}"'
+        return response
+
+
+class MessageViewSet(ConditionalGetMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Returns a message with its replies at any depth, for example to expand a
+    collapsed branch of a thread. ``max_depth`` limits how many levels of replies
+    are included and ``limit`` how many messages in total, taken in thread order so
+    every returned reply comes with its parent. ``truncated`` tells whether
+    ``limit`` cut the subtree short.
+    """
+    queryset = Message.objects.all()
+    serializer_class = MessageSerializer
+    query_budget = {"retrieve": 2}
+    # The validators are read from the subtree rather than the message alone.
+    etag_fields = []
+
+    def get_object(self):
+        # Read by both get_validators and retrieve.
+        if not hasattr(self, "_object"):
+            self._object = super().get_object()
+        return self._object
+
+    def get_subtree(self):
+        params = MessageSubtreeQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        # The subtree is a single range scan of the materialized paths.
+        subtree = Message.objects.subtree(self.get_object(), max_depth=params.validated_data.get("max_depth"))
+        return subtree, params.validated_data["limit"]
+
+    def get_validators(self):
+        subtree, limit = self.get_subtree()
+        return self.subtree_validators(list(subtree.values_list(*SUBTREE_VALIDATORS)[:limit + 1]))
+
+    def get_response_validators(self):
+        return self.subtree_validators(self.etag_rows)
+
+    def subtree_validators(self, rows):
+        # No Last-Modified, deleting a reply changes the subtree without moving any timestamp.
+        return make_etag(self.request, rows), None
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(self.render_subtree, request, *args, **kwargs)
+
+    def render_subtree(self, request, *args, **kwargs):
+        subtree, limit = self.get_subtree()
+        messages = list(subtree[:limit + 1])
+        self.etag_rows = [tuple(getattr(message, name) for name in SUBTREE_VALIDATORS) for message in messages]
+        data = self.get_serializer(build_thread(messages[:limit])[0]).data
+        data["truncated"] = len(messages) > limit
+        return Response(data)
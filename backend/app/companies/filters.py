@@ -0,0 +1,26 @@
+from django_filters import rest_framework as filters
+
+from .models import BOOKING_TOTAL_ANNOTATIONS, Company, DailyRollup
+
+
+class CompanyFilter(filters.FilterSet):
+    min_total_bookings = filters.NumberFilter(
+        field_name=BOOKING_TOTAL_ANNOTATIONS["total_bookings"], lookup_expr="gte"
+    )
+    max_total_bookings = filters.NumberFilter(
+        field_name=BOOKING_TOTAL_ANNOTATIONS["total_bookings"], lookup_expr="lte"
+    )
+
+    class Meta:
+        model = Company
+        fields = ["min_total_bookings", "max_total_bookings"]
+
+
+class DailyRollupFilter(filters.FilterSet):
+    company = filters.NumberFilter()
+    product = filters.NumberFilter()
+    date = filters.DateFromToRangeFilter()
+
+    class Meta:
+        model = DailyRollup
+        fields = ["company", "product", "date"]
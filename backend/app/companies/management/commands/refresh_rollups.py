@@ -0,0 +1,17 @@
+from companies.rollups import refresh_daily_rollups
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Refresh the daily company and product rollups from the bookings changed since the last refresh"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild every rollup instead of only those with changed bookings or trips",
+        )
+
+    def handle(self, *args, **options):
+        refreshed = refresh_daily_rollups(full=options["full"])
+        self.stdout.write(f"Refreshed the rollups of {refreshed} product days.")
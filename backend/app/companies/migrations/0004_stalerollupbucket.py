@@ -0,0 +1,39 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookings", "0011_message_updated_at"),
+        ("companies", "0003_company_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StaleRollupBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "product",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="bookings.product",
+                    ),
+                ),
+            ],
+        ),
+    ]
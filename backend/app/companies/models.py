@@ -1,10 +1,45 @@
 from bookings.models import Booking
 from django.db import models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+# Annotations added by CompanyQuerySet.with_booking_totals, keyed by the field they back.
+BOOKING_TOTAL_ANNOTATIONS = {
+    "total_bookings": "annotated_total_bookings",
+    "pending_bookings": "annotated_pending_bookings",
+    "approved_bookings": "annotated_approved_bookings",
+    "rejected_bookings": "annotated_rejected_bookings",
+    "approved_pax": "annotated_approved_pax",
+}
+
+BOOKINGS = "product__trip__booking"
+
+
+class CompanyQuerySet(models.QuerySet):
+    def with_booking_totals(self, fields=tuple(BOOKING_TOTAL_ANNOTATIONS)):
+        """
+        Annotates the totals named in ``fields`` (keys of BOOKING_TOTAL_ANNOTATIONS),
+        counted for every company in the same grouped query that loads them, so a
+        page costs one query whatever its size and can be filtered and ordered by
+        its totals.
+        """
+        approved = Q(**{f"{BOOKINGS}__status": "APPROVED"})
+        totals = {
+            "total_bookings": Count(BOOKINGS),
+            "pending_bookings": Count(BOOKINGS, filter=Q(**{f"{BOOKINGS}__status": "PENDING"})),
+            "approved_bookings": Count(BOOKINGS, filter=approved),
+            "rejected_bookings": Count(BOOKINGS, filter=Q(**{f"{BOOKINGS}__status": "REJECTED"})),
+            "approved_pax": Coalesce(Sum(f"{BOOKINGS}__pax", filter=approved), 0),
+        }
+        return self.annotate(**{BOOKING_TOTAL_ANNOTATIONS[name]: totals[name] for name in fields})
 
 
 class Company(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CompanyQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -12,3 +47,59 @@ class Company(models.Model):
     @property
     def total_bookings(self):
         return Booking.objects.filter(trip__product__company=self).count()
+
+
+class DailyRollup(models.Model):
+    """
+    Bookings of one product's trips departing on one date, with the pax, capacity
+    and revenue the ops dashboards report. Rows are written by
+    companies.rollups.refresh_daily_rollups, never by hand.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="daily_rollups")
+    product = models.ForeignKey("bookings.Product", on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    bookings = models.PositiveIntegerField(default=0)
+    approved_pax = models.PositiveIntegerField(default=0)
+    # Sum of the max_pax of the product's trips departing that day.
+    capacity = models.PositiveIntegerField(default=0)
+    fill_rate = models.FloatField(default=0)
+    # Product price times the approved pax.
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "date"], name="dailyrollup_product_date_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["date", "id"], name="dailyrollup_date_idx"),
+            models.Index(fields=["company", "date"], name="dailyrollup_company_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.date}"
+
+
+class StaleRollupBucket(models.Model):
+    """
+    A (product, date) bucket that trips or bookings moved out of, by changing date,
+    product or trip, or by being deleted. The next refresh recomputes it, since
+    nothing left in it has changed, then removes the row.
+    """
+    # Unconstrained, the trips of a product being deleted note their buckets while
+    # it goes. The refresh finds nothing left in those, as their rollups cascaded.
+    product = models.ForeignKey(
+        "bookings.Product", on_delete=models.DO_NOTHING, db_constraint=False, related_name="+"
+    )
+    date = models.DateField()
+
+    def __str__(self):
+        return f"{self.product_id} on {self.date}"
+
+
+class RollupWatermark(models.Model):
+    """The time a rollup was last refreshed, changes from then on are yet to be rolled up."""
+    name = models.CharField(max_length=100, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,135 @@
+import operator
+from datetime import timedelta
+from functools import reduce
+
+from bookings.models import Booking, Trip
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import DailyRollup, RollupWatermark, StaleRollupBucket
+
+DAILY_ROLLUP = "daily"
+
+# Changes are re-read from this long before the watermark, so rows saved by
+# transactions that committed after the previous refresh read them are not missed.
+# Refreshing a bucket twice is harmless, every refresh recomputes it whole.
+ROLLUP_OVERLAP = timedelta(minutes=5)
+
+# Buckets refreshed per round of queries.
+BUCKET_BATCH_SIZE = 200
+
+ROLLUP_FIELDS = ["company", "bookings", "approved_pax", "capacity", "fill_rate", "revenue"]
+
+
+def stale_buckets(since=None):
+    """
+    Returns the (product id, date) buckets with a booking or trip changed since
+    ``since``, or every bucket with bookings when it is None. Buckets that rows
+    moved out of are recorded as StaleRollupBucket, see companies.signals, and
+    are read by the caller.
+    """
+    bookings = Booking.objects.values_list("trip__product", "trip__start_date").distinct()
+    if since is None:
+        return set(bookings)
+    trips = Trip.objects.filter(updated_at__gte=since).values_list("product", "start_date").distinct()
+    return set(bookings.filter(updated_at__gte=since)) | set(trips)
+
+
+def compute_rollups(buckets):
+    """
+    Computes the rollups of ``buckets`` from the bookings and trips, with one
+    grouped query over each. Buckets left without bookings get no rollup.
+    """
+    buckets = set(buckets)
+    product_ids = {product_id for product_id, _ in buckets}
+    dates = {date for _, date in buckets}
+    approved = Q(status="APPROVED")
+
+    capacities = {
+        (row["product"], row["start_date"]): row["capacity"]
+        for row in Trip.objects.filter(product__in=product_ids, start_date__in=dates)
+        .values("product", "start_date")
+        .annotate(capacity=Sum("max_pax"))
+    }
+    totals = (
+        Booking.objects.filter(trip__product__in=product_ids, trip__start_date__in=dates)
+        .values("trip__product", "trip__product__company", "trip__start_date")
+        .annotate(
+            bookings=Count("pk"),
+            approved_pax=Sum("pax", filter=approved, default=0),
+            revenue=Sum(
+                F("pax") * F("trip__product__price"),
+                filter=approved,
+                default=0,
+                output_field=models.DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+        .order_by()
+    )
+
+    rollups = []
+    for row in totals:
+        bucket = (row["trip__product"], row["trip__start_date"])
+        if bucket not in buckets:
+            continue
+        capacity = capacities.get(bucket, 0)
+        rollups.append(DailyRollup(
+            company_id=row["trip__product__company"],
+            product_id=bucket[0],
+            date=bucket[1],
+            bookings=row["bookings"],
+            approved_pax=row["approved_pax"],
+            capacity=capacity,
+            fill_rate=row["approved_pax"] / capacity if capacity else 0,
+            revenue=row["revenue"],
+        ))
+    return rollups
+
+
+def refresh_buckets(buckets):
+    """Rewrites the rollups of ``buckets``, deleting those of buckets left without bookings."""
+    rollups = compute_rollups(buckets)
+    DailyRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=["product", "date"],
+        update_fields=ROLLUP_FIELDS,
+    )
+    emptied = set(buckets) - {(rollup.product_id, rollup.date) for rollup in rollups}
+    if emptied:
+        DailyRollup.objects.filter(
+            reduce(operator.or_, (Q(product=product_id, date=date) for product_id, date in emptied))
+        ).delete()
+
+
+def refresh_daily_rollups(full=False):
+    """
+    Brings DailyRollup up to date and returns the number of buckets refreshed.
+
+    Only the buckets of the bookings and trips whose ``updated_at`` moved past the
+    watermark left by the previous refresh, and the buckets they moved out of,
+    are recomputed, unless ``full`` is set or no refresh ran yet, in which case
+    every rollup is rebuilt. Deleting a booking touches its trip (see
+    companies.signals), but changing a product's price only shows up in its
+    rollups after a full refresh.
+    """
+    started_at = timezone.now()
+    with transaction.atomic():
+        watermark = RollupWatermark.objects.select_for_update().filter(name=DAILY_ROLLUP).first()
+        # Only the rows read here are removed, those of transactions committing
+        # meanwhile are left for the next refresh.
+        vacated = list(StaleRollupBucket.objects.values_list("pk", "product", "date"))
+        StaleRollupBucket.objects.filter(pk__in=[pk for pk, _, _ in vacated]).delete()
+        if full or watermark is None:
+            DailyRollup.objects.all().delete()
+            buckets = stale_buckets()
+        else:
+            buckets = stale_buckets(since=watermark.value - ROLLUP_OVERLAP)
+            buckets |= {(product_id, date) for _, product_id, date in vacated}
+
+        buckets = sorted(buckets)
+        for start in range(0, len(buckets), BUCKET_BATCH_SIZE):
+            refresh_buckets(buckets[start:start + BUCKET_BATCH_SIZE])
+        RollupWatermark.objects.update_or_create(name=DAILY_ROLLUP, defaults={"value": started_at})
+    return len(buckets)
@@ -1,10 +1,43 @@
 from rest_framework import serializers
 
-from .models import Company
+from app.sparse_fieldsets import SparseFieldsetSerializerMixin
+from bookings.serializers import AnnotatedReadOnlyField
 
+from .models import BOOKING_TOTAL_ANNOTATIONS, Company, DailyRollup
+
+
+class CompanySerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    total_bookings = AnnotatedReadOnlyField(BOOKING_TOTAL_ANNOTATIONS["total_bookings"])
+    pending_bookings = AnnotatedReadOnlyField(BOOKING_TOTAL_ANNOTATIONS["pending_bookings"])
+    approved_bookings = AnnotatedReadOnlyField(BOOKING_TOTAL_ANNOTATIONS["approved_bookings"])
+    rejected_bookings = AnnotatedReadOnlyField(BOOKING_TOTAL_ANNOTATIONS["rejected_bookings"])
+    approved_pax = AnnotatedReadOnlyField(BOOKING_TOTAL_ANNOTATIONS["approved_pax"])
 
-class CompanySerializer(serializers.ModelSerializer):
     class Meta:
         model = Company
-        fields = ["id", "name", "description", "total_bookings"]
-        read_only_fields = ["total_bookings"]
+        fields = [
+            "id",
+            "name",
+            "description",
+            "total_bookings",
+            "pending_bookings",
+            "approved_bookings",
+            "rejected_bookings",
+            "approved_pax",
+        ]
+
+
+class DailyRollupSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = DailyRollup
+        fields = [
+            "id",
+            "company",
+            "product",
+            "date",
+            "bookings",
+            "approved_pax",
+            "capacity",
+            "fill_rate",
+            "revenue",
+        ]
@@ -0,0 +1,56 @@
+from app.response_cache import invalidate_on_write
+from bookings.models import Booking, Trip
+from django.db.models.signals import post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Company, StaleRollupBucket
+
+invalidate_on_write(Company)
+
+# Trip and Booking fields deciding which rollup bucket a row counts in.
+TRIP_BUCKET_FIELDS = {"product", "product_id", "start_date"}
+BOOKING_BUCKET_FIELDS = {"trip", "trip_id"}
+
+
+def changes_bucket(instance, update_fields, fields):
+    if instance._state.adding:
+        return False
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+@receiver(post_delete, sender=Booking)
+def touch_trip(sender, instance, **kwargs):
+    # Deleted bookings leave nothing behind for the rollup refresh to find, so
+    # their trip is marked as changed instead, see companies.rollups.
+    Trip.objects.filter(pk=instance.trip_id).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=Booking)
+def touch_previous_trip(sender, instance, raw=False, update_fields=None, **kwargs):
+    # A booking moved to another trip is found by the refresh in its new bucket,
+    # the trip it left is marked as changed for its old one.
+    if raw or not changes_bucket(instance, update_fields, BOOKING_BUCKET_FIELDS):
+        return
+    # The row Booking.save has just locked.
+    previous = getattr(instance, "_previous", None)
+    if previous is not None and previous.trip_id != instance.trip_id:
+        Trip.objects.filter(pk=previous.trip_id).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=Trip)
+def note_previous_bucket(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not changes_bucket(instance, update_fields, TRIP_BUCKET_FIELDS):
+        return
+    # Remembered by Trip when it was read or last saved. Trips built with a
+    # primary key, or read without these fields, look their bucket up.
+    previous = getattr(instance, "_stored_bucket", None)
+    if previous is None:
+        previous = Trip.objects.filter(pk=instance.pk).values_list("product_id", "start_date").first()
+    if previous is not None and previous != (instance.product_id, instance.start_date):
+        StaleRollupBucket.objects.create(product_id=previous[0], date=previous[1])
+
+
+@receiver(pre_delete, sender=Trip)
+def note_deleted_bucket(sender, instance, **kwargs):
+    StaleRollupBucket.objects.create(product_id=instance.product_id, date=instance.start_date)
@@ -0,0 +1,179 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from bookings.models import Booking, Product, Trip
+
+from ..models import Company, DailyRollup, StaleRollupBucket
+from ..rollups import refresh_daily_rollups
+
+
+YEAR_IN_FUTURE = 3000
+
+
+def create_product(company_name="Test Company", price=100):
+    company = Company.objects.create(name=company_name)
+    return Product.objects.create(name="Test Product", description="Description", price=price, company=company)
+
+
+def create_trip(product, day, max_pax=10):
+    return Trip.objects.create(
+        product=product,
+        start_date=date(YEAR_IN_FUTURE, 1, day),
+        end_date=date(YEAR_IN_FUTURE, 1, 20),
+        max_pax=max_pax,
+    )
+
+
+def age_changes():
+    """Moves every booking and trip change well before the next refresh's window."""
+    long_ago = timezone.now() - timedelta(days=1)
+    Booking.objects.update(updated_at=long_ago)
+    Trip.objects.update(updated_at=long_ago)
+
+
+class RefreshDailyRollupsTest(TestCase):
+    def setUp(self):
+        self.product = create_product(price=Decimal("120.50"))
+        self.first_day = create_trip(self.product, day=1, max_pax=10)
+        create_trip(self.product, day=1, max_pax=6)
+        self.second_day = create_trip(self.product, day=2, max_pax=4)
+        Booking.objects.create(trip=self.first_day, pax=3).approve_booking()
+        Booking.objects.create(trip=self.first_day, pax=2)
+        self.pending = Booking.objects.create(trip=self.second_day, pax=1)
+
+    def rollup(self, day):
+        return DailyRollup.objects.get(product=self.product, date=date(YEAR_IN_FUTURE, 1, day))
+
+    def test_full_refresh(self):
+        self.assertEqual(refresh_daily_rollups(), 2)
+
+        rollup = self.rollup(1)
+        self.assertEqual(rollup.company_id, self.product.company_id)
+        self.assertEqual(rollup.bookings, 2)
+        self.assertEqual(rollup.approved_pax, 3)
+        self.assertEqual(rollup.capacity, 16)
+        self.assertEqual(rollup.fill_rate, 3 / 16)
+        self.assertEqual(rollup.revenue, Decimal("361.50"))
+        self.assertEqual(self.rollup(2).revenue, 0)
+
+    def test_incremental_refresh_only_reads_changes_since_the_watermark(self):
+        refresh_daily_rollups()
+        age_changes()
+        self.assertEqual(refresh_daily_rollups(), 0)
+
+        self.pending.approve_booking()
+        self.assertEqual(refresh_daily_rollups(), 1)
+        self.assertEqual(self.rollup(2).approved_pax, 1)
+        self.assertEqual(self.rollup(2).fill_rate, 0.25)
+
+        age_changes()
+        self.second_day.max_pax = 8
+        self.second_day.save()
+        self.assertEqual(refresh_daily_rollups(), 1)
+        self.assertEqual(self.rollup(2).capacity, 8)
+
+    def test_deleted_bookings_are_rolled_up(self):
+        refresh_daily_rollups()
+        age_changes()
+
+        self.pending.delete()
+        self.assertEqual(refresh_daily_rollups(), 1)
+        self.assertFalse(DailyRollup.objects.filter(date=date(YEAR_IN_FUTURE, 1, 2)).exists())
+        self.assertEqual(self.rollup(1).bookings, 2)
+
+    def test_trips_moving_dates_leave_their_old_bucket(self):
+        refresh_daily_rollups()
+        age_changes()
+
+        self.second_day.start_date = date(YEAR_IN_FUTURE, 1, 3)
+        # The old bucket is remembered from creation, not selected again.
+        with CaptureQueriesContext(connection) as queries:
+            self.second_day.save()
+        self.assertFalse([query for query in queries if query["sql"].startswith('SELECT "bookings_trip"')])
+        self.assertEqual(refresh_daily_rollups(), 2)
+        self.assertFalse(DailyRollup.objects.filter(date=date(YEAR_IN_FUTURE, 1, 2)).exists())
+        self.assertEqual(self.rollup(3).bookings, 1)
+        self.assertFalse(StaleRollupBucket.objects.exists())
+
+    def test_trips_moving_twice_leave_each_bucket(self):
+        trip = Trip.objects.get(pk=self.second_day.pk)
+        for day in (3, 4):
+            trip.start_date = date(YEAR_IN_FUTURE, 1, day)
+            trip.save()
+
+        self.assertEqual(
+            sorted(StaleRollupBucket.objects.values_list("date", flat=True)),
+            [date(YEAR_IN_FUTURE, 1, 2), date(YEAR_IN_FUTURE, 1, 3)],
+        )
+
+    def test_bookings_moving_trips_leave_their_old_bucket(self):
+        refresh_daily_rollups()
+        age_changes()
+
+        self.pending.trip = self.first_day
+        # Booking.save reads the previous row once, for booked_pax and the signal.
+        with CaptureQueriesContext(connection) as queries:
+            self.pending.save()
+        self.assertEqual(len([query for query in queries if query["sql"].startswith('SELECT "bookings_booking"')]), 1)
+        refresh_daily_rollups()
+        self.assertFalse(DailyRollup.objects.filter(date=date(YEAR_IN_FUTURE, 1, 2)).exists())
+        self.assertEqual(self.rollup(1).bookings, 3)
+
+    def test_deleted_trips_leave_their_bucket(self):
+        refresh_daily_rollups()
+        age_changes()
+
+        self.second_day.delete()
+        self.assertEqual(refresh_daily_rollups(), 1)
+        self.assertFalse(DailyRollup.objects.filter(date=date(YEAR_IN_FUTURE, 1, 2)).exists())
+
+        self.product.delete()
+        refresh_daily_rollups()
+        self.assertFalse(DailyRollup.objects.exists())
+
+    def test_command(self):
+        out = StringIO()
+        call_command("refresh_rollups", "--full", stdout=out)
+        self.assertEqual(out.getvalue().strip(), "Refreshed the rollups of 2 product days.")
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class DailyRollupViewSetTest(APITestCase):
+    def setUp(self):
+        self.product = create_product()
+        self.other_product = create_product("Other Company")
+        for day in (1, 2, 3):
+            Booking.objects.create(trip=create_trip(self.product, day), pax=day)
+        Booking.objects.create(trip=create_trip(self.other_product, 2), pax=5)
+        refresh_daily_rollups()
+
+    def test_filter_by_date_range_and_company(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("dailyrollup-list"), {
+                "date_after": date(YEAR_IN_FUTURE, 1, 2),
+                "date_before": date(YEAR_IN_FUTURE, 1, 3),
+            })
+        self.assertEqual(
+            [(row["product"], row["date"], row["bookings"]) for row in response.data["results"]],
+            [
+                (self.product.id, "3000-01-02", 1),
+                (self.other_product.id, "3000-01-02", 1),
+                (self.product.id, "3000-01-03", 1),
+            ],
+        )
+
+        response = self.client.get(reverse("dailyrollup-list"), {"company": self.other_product.company_id})
+        self.assertEqual([row["product"] for row in response.data["results"]], [self.other_product.id])
+
+    def test_read_only(self):
+        response = self.client.post(reverse("dailyrollup-list"), {})
+        self.assertEqual(response.status_code, 405)
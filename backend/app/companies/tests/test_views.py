@@ -0,0 +1,74 @@
+from datetime import date
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from bookings.models import Booking, Product, Trip
+
+from ..models import Company
+
+
+YEAR_IN_FUTURE = 3000
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class CompanyViewSetTest(APITestCase):
+    def create_company(self, name, statuses):
+        company = Company.objects.create(name=name)
+        product = Product.objects.create(name="Product", description="Description", price=100, company=company)
+        trip = Trip.objects.create(
+            product=product,
+            start_date=date(YEAR_IN_FUTURE, 1, 1),
+            end_date=date(YEAR_IN_FUTURE, 1, 20),
+            max_pax=20,
+        )
+        for pax, status in enumerate(statuses, start=1):
+            if status == "APPROVED":
+                Booking.objects.create(trip=trip, pax=pax).approve_booking()
+            else:
+                Booking.objects.create(trip=trip, pax=pax, status=status)
+        return company
+
+    def setUp(self):
+        self.quiet = self.create_company("Quiet", [])
+        self.busy = self.create_company("Busy", ["APPROVED", "APPROVED", "PENDING", "REJECTED"])
+        self.steady = self.create_company("Steady", ["APPROVED", "PENDING"])
+
+    def test_list_counts_bookings_in_one_grouped_query(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("company-list"))
+
+        totals = {row["id"]: row["total_bookings"] for row in response.data["results"]}
+        self.assertEqual(totals, {self.quiet.id: 0, self.busy.id: 4, self.steady.id: 2})
+        self.assertNotIn("approved_pax", response.data["results"][0])
+
+    def test_breakdowns_are_optional_fields(self):
+        response = self.client.get(reverse("company-detail", args=[self.busy.id]), {
+            "fields": "id,pending_bookings,approved_bookings,rejected_bookings,approved_pax",
+        })
+        self.assertEqual(response.data, {
+            "id": self.busy.id,
+            "pending_bookings": 1,
+            "approved_bookings": 2,
+            "rejected_bookings": 1,
+            "approved_pax": 3,
+        })
+
+        response = self.client.get(reverse("company-detail", args=[self.quiet.id]), {"fields": "approved_pax"})
+        self.assertEqual(response.data, {"approved_pax": 0})
+
+    def test_order_and_filter_by_total_bookings(self):
+        def ids(params):
+            response = self.client.get(reverse("company-list"), params)
+            return [row["id"] for row in response.data["results"]]
+
+        self.assertEqual(ids({"ordering": "-total_bookings"}), [self.busy.id, self.steady.id, self.quiet.id])
+        self.assertEqual(ids({"min_total_bookings": 1, "ordering": "total_bookings"}), [self.steady.id, self.busy.id])
+        self.assertEqual(ids({"max_total_bookings": 2}), [self.quiet.id, self.steady.id])
+
+    def test_create_returns_total_bookings(self):
+        response = self.client.post(reverse("company-list"), {"name": "New"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["total_bookings"], 0)
+        self.assertNotIn("approved_pax", response.data)
@@ -1,10 +1,11 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import CompanyViewSet
+from .views import CompanyViewSet, DailyRollupViewSet
 
 router = DefaultRouter()
 router.register(r"companies", CompanyViewSet)
+router.register(r"rollups", DailyRollupViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -1,9 +1,57 @@
+from django.db.models import Max
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets
 
-from .models import Company
-from .serializers import CompanySerializer
+from app.conditional import ConditionalGetMixin
+from app.fast_list import FastListMixin
+from app.pagination import CursorOrPageNumberPagination
+from app.response_cache import CachedResponseMixin
+from app.sparse_fieldsets import SparseFieldsetMixin
+from bookings.filters import AliasedOrderingFilter
+from bookings.models import Booking, Product, Trip
 
+from .filters import CompanyFilter, DailyRollupFilter
+from .models import BOOKING_TOTAL_ANNOTATIONS, BOOKINGS, Company, DailyRollup
+from .serializers import CompanySerializer, DailyRollupSerializer
 
-class CompanyViewSet(viewsets.ModelViewSet):
+
+class CompanyViewSet(
+    CachedResponseMixin, ConditionalGetMixin, FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet
+):
     queryset = Company.objects.all()
     serializer_class = CompanySerializer
+    cache_models = [Company, Product, Trip, Booking]
+    # The total counts added and deleted bookings, the latest update status changes.
+    etag_fields = ["updated_at", BOOKING_TOTAL_ANNOTATIONS["total_bookings"]]
+    etag_aggregates = {"bookings_updated_at": Max(f"{BOOKINGS}__updated_at")}
+    filter_backends = [DjangoFilterBackend, AliasedOrderingFilter]
+    filterset_class = CompanyFilter
+    ordering_fields = ["name", "total_bookings"]
+    ordering_aliases = {"total_bookings": BOOKING_TOTAL_ANNOTATIONS["total_bookings"]}
+    ordering = ["id"]
+    optional_fields = ["pending_bookings", "approved_bookings", "rejected_bookings", "approved_pax"]
+    query_budget = {"list": 2, "retrieve": 1}
+
+    def get_queryset(self):
+        # total_bookings is always counted since the filters and ordering read it.
+        totals = [
+            name for name in BOOKING_TOTAL_ANNOTATIONS
+            if name == "total_bookings" or self.is_field_requested(name)
+        ]
+        return super().get_queryset().with_booking_totals(totals)
+
+
+class DailyRollupViewSet(ConditionalGetMixin, FastListMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Daily bookings, approved pax, fill rate and revenue per company and product,
+    as of the last run of the refresh_rollups command. Filter with ``company``,
+    ``product`` and ``date_after`` / ``date_before``.
+    """
+    queryset = DailyRollup.objects.all()
+    serializer_class = DailyRollupSerializer
+    filterset_class = DailyRollupFilter
+    pagination_class = CursorOrPageNumberPagination
+    ordering = ["date", "id"]
+    # Rollups are rewritten in place by refresh_rollups, without a timestamp.
+    etag_fields = ["bookings", "approved_pax", "capacity", "revenue"]
+    query_budget = {"list": 1, "retrieve": 1}